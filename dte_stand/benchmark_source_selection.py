@@ -0,0 +1,77 @@
+import sys
+import time
+import networkx
+
+from dte_stand.paths.dag_calculator import DAGCalculator
+
+SOURCE_SELECTIONS = ['longest_path', 'double_sweep', 'pseudo_peripheral']
+
+
+def to_topology(graph: networkx.Graph) -> networkx.MultiDiGraph:
+    # same as convert.py does: every undirected link becomes a pair of directed links
+    topology = networkx.MultiDiGraph()
+    topology.add_nodes_from(str(node) for node in graph.nodes)
+    for node_from, node_to in graph.edges():
+        topology.add_edge(str(node_from), str(node_to), bandwidth=1000, current_bandwidth=0)
+        topology.add_edge(str(node_to), str(node_from), bandwidth=1000, current_bandwidth=0)
+    return topology
+
+
+def synthetic_topologies():
+    yield 'grid 10x10', to_topology(networkx.grid_2d_graph(10, 10))
+    yield 'barabasi-albert 200', to_topology(networkx.barabasi_albert_graph(200, 2, seed=1))
+    yield 'waxman 150', to_topology(networkx.waxman_graph(150, beta=0.4, alpha=0.1, seed=1))
+    yield 'ring of cliques 20x5', to_topology(networkx.ring_of_cliques(20, 5))
+
+
+def path_diversity(calculator: DAGCalculator, topology: networkx.MultiDiGraph):
+    """
+    average number of nexthops per pair that has a path, share of such pairs with at least 2 nexthops
+        and share of pairs that have no path
+    """
+    nexthop_counts = [len(nexthops) for nexthops in calculator.forwarding_table.nexthops.values()]
+    reachable = [count for count in nexthop_counts if count > 0]
+    if not reachable:
+        return 0.0, 0.0, 1.0
+    return (sum(reachable) / len(reachable),
+            sum(1 for count in reachable if count >= 2) / len(reachable),
+            1 - len(reachable) / len(nexthop_counts))
+
+
+def benchmark(name: str, topology: networkx.MultiDiGraph):
+    # only the largest connected part, dfs numbering covers one component
+    largest = max(networkx.weakly_connected_components(topology), key=len)
+    topology = topology.subgraph(largest).copy()
+    print(f'{name}: {topology.number_of_nodes()} nodes, {topology.number_of_edges()} links')
+    for source_selection in SOURCE_SELECTIONS:
+        calculator = DAGCalculator(cache_size=0, source_selection=source_selection)
+        undirected_topo = networkx.Graph(topology)
+        start = time.perf_counter()
+        source = calculator._select_source(undirected_topo)
+        selection_time = time.perf_counter() - start
+        start = time.perf_counter()
+        calculator.prepare_iteration(topology)
+        prepare_time = time.perf_counter() - start
+        average, multiple, unreachable = path_diversity(calculator, topology)
+        print(f'  {source_selection:>18}: source {source:>8}, selection {selection_time * 1000:9.2f} ms, '
+              f'prepare {prepare_time * 1000:9.2f} ms, nexthops per pair {average:.3f}, '
+              f'pairs with >=2 nexthops {multiple:.3f}, pairs without path {unreachable:.3f}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in ('-h', '--help'):
+        print('Usage: benchmark_source_selection.py [path_to_topo_file ...]\n'
+              'Compares source selection methods of DAGCalculator by time and path diversity.\n'
+              'path_to_topo_file is a path to topology in gml format converted for dte stand.\n'
+              'If no files are given, data_examples/huawei.gml and several synthetic topologies are used\n')
+        exit(1)
+
+    topologies = []
+    for topo_filepath in sys.argv[1:] or ['data_examples/huawei.gml']:
+        with open(topo_filepath, mode='rb') as f:
+            topologies.append((topo_filepath, networkx.readwrite.read_gml(f)))
+    if len(sys.argv) == 1:
+        topologies.extend(synthetic_topologies())
+
+    for name, topology in topologies:
+        benchmark(name, topology)
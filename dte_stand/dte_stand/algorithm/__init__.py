@@ -1,2 +1,17 @@
-from dte_stand.algorithm.dummy import DummyAlgorithm
-from dte_stand.algorithm.mate_run import MateAlgorithm
\ No newline at end of file
+from typing import TYPE_CHECKING
+
+from dte_stand.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from dte_stand.algorithm.dummy import DummyAlgorithm
+    from dte_stand.algorithm.mate_run import MateAlgorithm
+
+# algorithms are imported on first use: MateAlgorithm loads tensorflow,
+#     which configurations with other algorithms do not need
+_ALGORITHMS = {
+    'DummyAlgorithm': 'dte_stand.algorithm.dummy',
+    'MateAlgorithm': 'dte_stand.algorithm.mate_run',
+}
+__all__ = list(_ALGORITHMS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _ALGORITHMS)
@@ -1,4 +1,3 @@
-import copy
 import csv
 import os, sys
 
@@ -9,11 +8,18 @@ import tensorflow_probability as tfp
 from tensorflow import keras
 
 import dte_stand.algorithm.mate.utils.tf_logs as tf_logs
+from dte_stand.algorithm.mate.agents.rollout_workers import RolloutWorkers
 from dte_stand.algorithm.mate.environment.environment import Environment
+from dte_stand.algorithm.mate.environment.vector_environment import VectorEnvironment
 from dte_stand.algorithm.mate.lib.actor import Actor
 from dte_stand.algorithm.mate.lib.critic import Critic
+from dte_stand.algorithm.mate.lib.numpy_actor import export_actor
+from dte_stand.algorithm.mate.utils.advantages import gae_advantages
 #import matplotlib.pyplot as plt
 
+import logging
+LOG = logging.getLogger(__name__)
+
 
 @gin.configurable
 class PPOAgent(object):
@@ -37,17 +43,22 @@ class PPOAgent(object):
                  eval_period=2,
                  max_evals=5,
                  select_max_action=False,
-                 optimizer= tf.keras.optimizers.Adam(
-                     learning_rate=0.0003,
-                     beta_1=0.9,
-                     epsilon=0.00001),
+                 optimizer=None,
                  change_traffic=True,
                  change_traffic_period=1,
                  base_dir='logs',
                  checkpoint_base_dir='checkpoints',
-                 save_checkpoints=True):
+                 save_checkpoints=True,
+                 num_envs=1,
+                 rollout_workers=0,
+                 shared_encoder=False):
 
         self.env = env
+        # if True, critic reads values from link states of the actor's message passing
+        #     and its own message passing is not used
+        self.shared_encoder = shared_encoder
+        # episodes are run in num_envs copies of env at once, env is the first of them
+        self.envs = VectorEnvironment.from_environment(env, num_envs)
         self.eval_env_type = eval_env_type
         self.num_eval_samples = num_eval_samples
         self.clip_param = clip_param
@@ -55,6 +66,9 @@ class PPOAgent(object):
         #print("GET ACTOR CRITIC")
         self._get_actor_critic_functions()
         #print("AFTER GET ACTOR CRITIC")
+        # optimizer is bound to the variables it updates, so every agent gets its own
+        if optimizer is None:
+            optimizer = tf.keras.optimizers.Adam(learning_rate=0.0003, beta_1=0.9, epsilon=0.00001)
         self.optimizer = optimizer
         self.critic_loss_factor = critic_loss_factor
         self.entropy_loss_factor = entropy_loss_factor
@@ -80,6 +94,9 @@ class PPOAgent(object):
         self.save_checkpoints = save_checkpoints
         self.reload_model = False
         self.change_sample = False
+        # if rollout_workers > 0, episodes are run by worker processes, each with num_envs environments
+        self.rollout_workers = rollout_workers
+        self.rollout_pool = None
 
     def _get_actor_critic_functions(self):
         #print("START ACTOR")
@@ -89,6 +106,43 @@ class PPOAgent(object):
         #print("END ACTOR")
         self.critic = Critic(self.env.G, num_features=self.env.num_features)
         self.critic.build()
+        if self.shared_encoder and self.actor.link_state_size != self.critic.link_state_size:
+            raise ValueError(f'Shared encoder needs the same link state size of actor and critic, '
+                             f'got {self.actor.link_state_size} and {self.critic.link_state_size}')
+
+    def _set_graph(self):
+        # networks do not depend on the topology, they are only given the links of the new one
+        self.actor.set_graph(self.env.G)
+        self.critic.set_graph(self.env.G)
+
+    def _trainable_variables(self):
+        if self.shared_encoder:
+            return self.actor.trainable_variables + self.critic.readout.trainable_variables
+        return self.actor.trainable_variables + self.critic.trainable_variables
+
+    def prepare_experiment(self, topology):
+        """
+        Prepares an agent that has already been trained to train again on a new topology,
+            keeping the networks and optimizer state. Compiled functions are traced again only
+            if the links of the topology do not fit in the buckets of the previous one
+
+        :param topology: new topology
+        """
+        for env in self.envs.envs:
+            env.current_topology = topology
+            env.initialize_environment(num_sample=env.init_sample)
+            env.get_weights()
+        self.envs.update_links()
+        self._set_graph()
+        self.change_sample = False
+        self.eval_step = 0
+        self.eval_episode = 0
+        if self.rollout_pool is not None:
+            if self.rollout_pool.fits(self):
+                self.rollout_pool.prepare_experiment(topology)
+            else:
+                # shared memory of workers is made for episodes of the previous topology
+                self.close_rollout_workers()
 
     def define_horizon(self):
         if self.given_horizon is not None:
@@ -101,71 +155,109 @@ class PPOAgent(object):
             self.horizon = 50
 
     def reset_env(self):
-        self.env.reset(change_sample=self.change_sample)
+        self.envs.reset(change_sample=self.change_sample)
         if self.change_sample and len(self.env.env_type) > 1:
-            actor_model = copy.deepcopy(self.actor.trainable_variables)
-            critic_model = copy.deepcopy(self.critic.trainable_variables)
-            self._get_actor_critic_functions()
-            self.load_model(actor_model, critic_model)
+            # sample may be of another topology
+            self._set_graph()
             self.define_horizon()
         self.change_sample = False
 
+    def close_rollout_workers(self):
+        if self.rollout_pool is not None:
+            self.rollout_pool.close()
+            self.rollout_pool = None
+
     def gae_estimation(self, rewards, values, last_value):
-        last_gae_lambda = 0
-        advantages = np.zeros_like(values, dtype=np.float32)
-        for i in reversed(range(self.horizon)):
-            if i == self.horizon - 1:
-                next_value = last_value
-            else:
-                next_value = values[i + 1]
-            delta = rewards[i] + self.gamma * next_value - values[i]
-            advantages[i] = last_gae_lambda = delta + self.gamma * self.gae_lambda * last_gae_lambda
-        returns = values + advantages
+        """
+        :param rewards: rewards of shape [horizon, num_envs]
+        :param values: values of shape [horizon, num_envs]
+        :param last_value: values of states after the last step, shape [num_envs]
+        """
+        # episodes do not end inside the horizon, every trajectory is bootstrapped with its last value
+        returns, advantages = gae_advantages(np.transpose(rewards), np.transpose(values), last_value,
+                                             self.gamma, self.gae_lambda)
+        returns, advantages = returns.T, advantages.T
         if self.normalize_advantages:
             advantages = (advantages - np.mean(advantages)) / (np.std(advantages) + 1e-8)
         return returns, advantages
 
     def run_episode(self):
+        """
+        Runs an episode in all environments at once
+
+        :return: states, actions, rewards, log_probs and values of shape [horizon, num_envs, ...],
+            values of the last states for each environment and phi of the first environment
+        """
+        if self.rollout_pool is not None:
+            return self._run_workers_episode()
         self.reset_env()
-        state = self.env.get_state()
-        states = np.zeros((self.horizon, self.env.n_links *
+        state = self.envs.get_state()
+        num_envs = self.envs.num_envs
+        states = np.zeros((self.horizon, num_envs, self.env.n_links *
                            self.actor.num_features), dtype=np.float32)
-        actions = np.zeros(self.horizon, dtype=np.float32)
-        rewards = np.zeros(self.horizon, dtype=np.float32)
-        log_probs = np.zeros(self.horizon, dtype=np.float32)
-        values = np.zeros(self.horizon, dtype=np.float32)
+        actions = np.zeros((self.horizon, num_envs), dtype=np.float32)
+        rewards = np.zeros((self.horizon, num_envs), dtype=np.float32)
+        log_probs = np.zeros((self.horizon, num_envs), dtype=np.float32)
+        values = np.zeros((self.horizon, num_envs), dtype=np.float32)
 
+        graph = self.actor.graph
         for t in range(self.horizon):
             #print("STATE",state)
-            action, log_prob = self.act(state)
+            action, log_prob, value = self.act_and_value(graph.pad_states(state), graph.inputs)
             #print("CHOSEN ACTION", action)
-            value = self.run_critic(state)
-            next_state, reward = self.env.step(action.numpy())
+            # environments write the next states into the same buffer, so the states are saved before the step
             states[t] = state
+            next_state, reward = self.envs.step(action.numpy())
             actions[t] = action
             rewards[t] = reward
             log_probs[t] = log_prob
-            values[t] = value.numpy()[0]
+            values[t] = value
             state = next_state
-        value = self.run_critic(state)
-        last_value = value.numpy()[0]
+        last_value = self.run_critic_batch(graph.pad_states(state), graph.inputs).numpy()
         phi = self.env.calculate_phi(self.env.G)
         #print("PHI", phi)
         return states, actions, rewards, log_probs, values, last_value, phi
 
+    def _run_workers_episode(self):
+        change_sample = self.change_sample
+        if change_sample:
+            # first environment follows the samples of the workers without routing flows,
+            #     other environments of the agent are not used while workers run episodes
+            self.env.next_sample()
+            if len(self.env.env_type) > 1:
+                self._set_graph()
+                self.define_horizon()
+            self.change_sample = False
+        if not self.rollout_pool.fits(self):
+            raise RuntimeError(f'Rollout workers were started for horizon {self.rollout_pool.horizon} and '
+                               f'{self.rollout_pool.n_links} links, agent has horizon {self.horizon} and '
+                               f'{self.env.n_links} links')
+        actor_weights = [variable.numpy() for variable in self.actor.trainable_variables]
+        critic_weights = [variable.numpy() for variable in self.critic.trainable_variables]
+        *episode, weights = self.rollout_pool.run_episode(actor_weights, critic_weights, change_sample)
+        self.env.raw_weights[:] = weights
+        self.env.get_weights()
+        # flows are routed only once, so that link loads of the first environment match the weights of the episode
+        self.env._get_HashWeights()
+        self.env._calculate_current_bandwidth(self.env.G, self.env.current_flows, self.env.hash_weights)
+        return tuple(episode)
+
     def run_update(self, states, actions, returns, advantages, log_probs):
         actor_losses, critic_losses, losses = [], [], []
-        inds = np.arange(self.horizon)
+        graph = self.actor.graph
+        states = graph.pad_states(states)
+        inds = np.arange(len(states))
         for _ in range(self.epochs):
             np.random.shuffle(inds)
-            for start in range(0, self.horizon, self.batch_size):
+            for start in range(0, len(states), self.batch_size):
                 end = start + self.batch_size
                 minibatch_ind = inds[start:end]
                 actor_loss, critic_loss, loss, grads = self.compute_losses_and_grads(states[minibatch_ind],
                                                                                      actions[minibatch_ind],
                                                                                      returns[minibatch_ind],
                                                                                      advantages[minibatch_ind],
-                                                                                     log_probs[minibatch_ind])
+                                                                                     log_probs[minibatch_ind],
+                                                                                     graph.inputs)
                 self.apply_grads(grads)
                 actor_losses.append(actor_loss.numpy())
                 critic_losses.append(critic_loss.numpy())
@@ -174,38 +266,57 @@ class PPOAgent(object):
 
     def train_and_evaluate(self, topology, current_flows, hash_function, iteration):
         training_episode = -1
-        self.env.get_current_flows(current_flows)
+        self.envs.get_current_flows(current_flows)
         self.phi_dct = {}
-        while not (self.env.num_sample == self.last_training_sample and self.change_sample):
-            #self.phi_graph()
-            if self.change_sample:
-                print('\n\tEvaluation ' + str(self.eval_episode) + '...\n')
-            training_episode += 1
-            print('Episode ', training_episode, '...')
-            states, actions, rewards, log_probs, values, last_value, phi = self.run_episode()
-            self.phi_dct[training_episode] = phi
-            returns, advantages = self.gae_estimation(rewards, values, last_value)
-            #print("BEFORE RUN UPDATE")
-            actor_losses, critic_losses, losses = self.run_update(states, actions, returns,
-                                                                  advantages, log_probs)
-            #print("AFTER RUN UPDATE")
-            tf_logs.training_episode_logs(self.writer, self.env, training_episode, states, rewards, losses,
-                                          actor_losses, critic_losses)
-
-            if (training_episode + 1) % self.eval_period == 0:
-                #print(self.phi_dct)
-                self.training_eval(topology, current_flows, hash_function, self.phi_dct, iteration)
-                if self.save_checkpoints:
-                    self.actor._set_inputs(states[0])
-                    self.critic._set_inputs(states[0])
-                    #print("MODEL IS SAVED TO ", os.path.join(self.checkpoint_dir,
-                    #                             'episode' + str(self.eval_episode)))
-                    self.save_model(os.path.join(self.checkpoint_dir,
-                                                 'episode' + str(self.eval_episode)))
-                if self.change_traffic and self.eval_episode % self.change_traffic_period == 0:
-                    self.change_sample = True
+        if self.rollout_workers > 0:
+            # workers are kept between experiments, they are started only for the first one
+            #     or when the shapes of episodes change
+            if self.rollout_pool is None:
+                self.rollout_pool = RolloutWorkers(self, self.rollout_workers, current_flows)
+            else:
+                self.rollout_pool.set_flows(current_flows)
+        try:
+            while not (self.env.num_sample == self.last_training_sample and self.change_sample):
+                #self.phi_graph()
+                if self.change_sample:
+                    print('\n\tEvaluation ' + str(self.eval_episode) + '...\n')
+                training_episode += 1
+                print('Episode ', training_episode, '...')
+                states, actions, rewards, log_probs, values, last_value, phi = self.run_episode()
+                self.phi_dct[training_episode] = phi
+                returns, advantages = self.gae_estimation(rewards, values, last_value)
+                # steps of all environments are used as one batch of samples
+                states, actions, returns, advantages, log_probs = [
+                    array.reshape(-1, *array.shape[2:])
+                    for array in (states, actions, returns, advantages, log_probs)]
+                #print("BEFORE RUN UPDATE")
+                actor_losses, critic_losses, losses = self.run_update(states, actions, returns,
+                                                                      advantages, log_probs)
+                #print("AFTER RUN UPDATE")
+                tf_logs.training_episode_logs(self.writer, self.env, training_episode, states, rewards, losses,
+                                              actor_losses, critic_losses)
+
+                if (training_episode + 1) % self.eval_period == 0:
+                    #print(self.phi_dct)
+                    self.training_eval(topology, current_flows, hash_function, self.phi_dct, iteration)
+                    if self.save_checkpoints:
+                        self.actor._set_inputs(states[0])
+                        self.critic._set_inputs(states[0])
+                        #print("MODEL IS SAVED TO ", os.path.join(self.checkpoint_dir,
+                        #                             'episode' + str(self.eval_episode)))
+                        self.save_model(os.path.join(self.checkpoint_dir,
+                                                     'episode' + str(self.eval_episode)))
+                    if self.change_traffic and self.eval_episode % self.change_traffic_period == 0:
+                        self.change_sample = True
+        except BaseException:
+            # workers may be left in the middle of an episode
+            self.close_rollout_workers()
+            raise
+        LOG.info(f'Traces of compiled functions: {self.tracing_counts()}')
         self.env._get_HashWeights()
-        return self.env.hash_weights, self.phi_dct
+        # environment keeps changing its compact hash weights in place, so a copy is returned
+        hash_weights = self.env.hash_weights.copy() if self.env.compact_hash_weights else self.env.hash_weights
+        return hash_weights, self.phi_dct
 
     def phi_graph(self, phi_dct=None, iteration=0):
         import csv
@@ -313,36 +424,46 @@ class PPOAgent(object):
         return actor_loss
 
     @tf.function
-    def get_new_log_prob_and_entropy(self, state, action):
-        logits = self.actor(state, training=True)
+    def get_new_log_prob_and_entropy(self, state, action, graph):
+        logits = self.actor.logits(state, graph, training=True)
         probs = tfp.distributions.Categorical(logits=logits)
         return (probs.log_prob(action), probs.entropy())
 
     @tf.function
-    def compute_losses_and_grads(self, states, actions, returns, advantages, old_log_probs):
+    def compute_losses_and_grads(self, states, actions, returns, advantages, old_log_probs, graph):
+        """
+        :param states: states padded to the bucket of graph
+        :param graph: GraphInputs of the topology of the states
+        """
         with tf.GradientTape(persistent=True) as tape:
-            new_log_probs, entropy = tf.map_fn(lambda x: self.get_new_log_prob_and_entropy(x[0], x[1]),
-                                               (states, actions), fn_output_signature=(tf.float32, tf.float32))
-            values = tf.map_fn(lambda x: self.critic(x, training=True),
-                               states, fn_output_signature=tf.float32)
-            values = tf.reshape(values, [-1])
+            # actor and critic take the whole minibatch at once
+            if self.shared_encoder:
+                link_states = self.actor.message_passing(states, graph)
+                probs = tfp.distributions.Categorical(
+                    logits=self.actor.readout_logits(link_states, graph, training=True))
+                new_log_probs, entropy = probs.log_prob(actions), probs.entropy()
+                values = self.critic.readout_value(link_states, graph, training=True)
+            else:
+                new_log_probs, entropy = self.get_new_log_prob_and_entropy(states, actions, graph)
+                values = self.critic.values(states, graph, training=True)
             critic_loss = tf.reduce_mean(tf.square(returns - values))
             entropy_loss = tf.reduce_mean(entropy)
             actor_loss = self.compute_actor_loss(new_log_probs, old_log_probs, advantages)
             loss = actor_loss - self.entropy_loss_factor * entropy_loss + self.critic_loss_factor * critic_loss
-        grads = tape.gradient(loss, self.actor.trainable_variables +
-                              self.critic.trainable_variables)
+        grads = tape.gradient(loss, self._trainable_variables())
         if self.max_grad_norm is not None:
             grads, _grad_norm = tf.clip_by_global_norm(grads, self.max_grad_norm)
         return actor_loss, critic_loss, loss, grads
 
     def apply_grads(self, grads):
-        self.optimizer.apply_gradients(
-            zip(grads, self.actor.trainable_variables + self.critic.trainable_variables))
+        self.optimizer.apply_gradients(zip(grads, self._trainable_variables()))
 
     @tf.function
-    def act(self, state, select_max=False):
-        logits = self.actor(state)
+    def act(self, state, graph, select_max=False):
+        """
+        :param state: one state padded to the bucket of graph
+        """
+        logits = tf.reshape(self.actor.logits(state, graph), [-1])
         #print("LOGITS")
         #tf.print(logits, output_stream=sys.stdout)
         probs = tfp.distributions.Categorical(logits=logits)
@@ -354,6 +475,27 @@ class PPOAgent(object):
             action = probs.sample(seed = 5)
         return action, probs.log_prob(action)
 
+    @tf.function
+    def act_and_value(self, states, graph, select_max=False):
+        """
+        Actions, their log probabilities and values of a batch of states in one call
+
+        :param states: states of all environments padded to the bucket of graph, shape [num_envs, padded state size]
+        :param graph: GraphInputs of the topology of the environments
+        """
+        link_states = self.actor.message_passing(states, graph)
+        logits = self.actor.readout_logits(link_states, graph)
+        if self.shared_encoder:
+            values = self.critic.readout_value(link_states, graph)
+        else:
+            values = self.critic.values(states, graph)
+        probs = tfp.distributions.Categorical(logits=logits)
+        if select_max:
+            action = tf.argmax(logits, axis=1)
+        else:
+            action = probs.sample(seed = 5)
+        return action, probs.log_prob(action), values
+
     @tf.function
     def eval_act(self, actor, state, select_max=False):
         logits = actor(state)
@@ -365,12 +507,34 @@ class PPOAgent(object):
         return action, probs.log_prob(action)
 
     @tf.function
-    def run_critic(self, state):
-        return self.critic(state)
+    def run_critic(self, state, graph):
+        return self.critic.values(state, graph)
+
+    @tf.function
+    def run_critic_batch(self, states, graph):
+        if self.shared_encoder:
+            return self.critic.readout_value(self.actor.message_passing(states, graph), graph)
+        return self.critic.values(states, graph)
+
+    def tracing_counts(self):
+        """
+        Number of traces of each compiled function. Functions are traced for every bucket of topology sizes
+            (and shape of batch), not for every topology
+        """
+        functions = {
+            'act_and_value': self.act_and_value,
+            'run_critic_batch': self.run_critic_batch,
+            'compute_losses_and_grads': self.compute_losses_and_grads,
+            'actor.message_passing': self.actor.message_passing,
+            'critic.message_passing': self.critic.message_passing,
+        }
+        return {name: function.experimental_get_tracing_count() for name, function in functions.items()}
 
     def save_model(self, checkpoint_dir):
         self.actor.save(checkpoint_dir + '/actor')
         self.critic.save(checkpoint_dir + '/critic')
+        # actor for inference with numpy only
+        export_actor(self.actor, checkpoint_dir + '/actor.npz')
 
     def load_model(self, actor_model, critic_model):
         for w_model, w_actor in zip(actor_model,
@@ -0,0 +1,258 @@
+import multiprocessing as mp
+import traceback
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import gin
+import numpy as np
+
+from dte_stand.algorithm.mate.environment.vector_environment import environment_settings
+
+import logging
+LOG = logging.getLogger(__name__)
+
+
+class SharedArrays(object):
+    """
+    Numpy arrays placed one after another in one block of shared memory
+
+    Parent process creates the block, workers attach to it by name and write their results in place
+    """
+
+    def __init__(self, specs: Dict[str, Tuple[tuple, str]], name: Optional[str] = None):
+        """
+        :param specs: shape and dtype of each array by its name
+        :param name: name of an existing block to attach to, new block is created if not given
+        """
+        self.specs = specs
+        offsets, size = {}, 0
+        for array_name, (shape, dtype) in specs.items():
+            # every array starts at an aligned offset
+            size = -(-size // 8) * 8
+            offsets[array_name] = size
+            size += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.arrays = {array_name: np.ndarray(shape, dtype=dtype, buffer=self.memory.buf,
+                                              offset=offsets[array_name])
+                       for array_name, (shape, dtype) in specs.items()}
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def __getitem__(self, array_name: str) -> np.ndarray:
+        return self.arrays[array_name]
+
+    def write(self, array_name: str, array) -> None:
+        """
+        Writes array in place of the shared array of the same shape
+        """
+        shared = self.arrays[array_name]
+        if np.shape(array) != shared.shape:
+            raise ValueError(f'Episode array {array_name} has shape {np.shape(array)}, but shared memory was made '
+                             f'for shape {shared.shape}: number of links or horizon changed, '
+                             f'rollout workers have to be started again')
+        shared[...] = array
+
+    def close(self, unlink: bool = False) -> None:
+        # arrays must be released before the memory can be closed
+        self.arrays = {}
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _episode_specs(horizon: int, num_envs: int, state_size: int, n_links: int) -> Dict[str, Tuple[tuple, str]]:
+    return {
+        'states': ((horizon, num_envs, state_size), 'float32'),
+        'actions': ((horizon, num_envs), 'float32'),
+        'rewards': ((horizon, num_envs), 'float32'),
+        'log_probs': ((horizon, num_envs), 'float32'),
+        'values': ((horizon, num_envs), 'float32'),
+        'last_value': ((num_envs,), 'float32'),
+        'phi': ((1,), 'float64'),
+        # weights of the first environment after the episode
+        'weights': ((n_links,), 'float32'),
+    }
+
+
+def _worker_main(connection, settings: dict) -> None:
+    """
+    Worker process: runs episodes of its own agent with the policy weights sent by the parent
+    """
+    try:
+        # tensorflow is imported only in the worker process
+        from dte_stand.algorithm.mate.agents.ppo_agent import PPOAgent
+        from dte_stand.algorithm.mate.environment.environment import Environment
+
+        gin.parse_config(settings['gin_config'])
+        env = Environment(**settings['environment'])
+        agent = PPOAgent(env, horizon=settings['horizon'], num_envs=settings['num_envs'],
+                         shared_encoder=settings['shared_encoder'], save_checkpoints=False)
+        agent.envs.get_current_flows(settings['environment']['current_flows'])
+        shared = SharedArrays(settings['specs'], name=settings['shared_memory'])
+    except Exception:
+        connection.send(('error', traceback.format_exc()))
+        return
+    connection.send(('ready', None))
+
+    try:
+        while True:
+            command, payload = connection.recv()
+            if command == 'close':
+                break
+            try:
+                if command == 'run':
+                    actor_weights, critic_weights, change_sample = payload
+                    agent.load_model(actor_weights, critic_weights)
+                    agent.change_sample = change_sample
+                    states, actions, rewards, log_probs, values, last_value, phi = agent.run_episode()
+                    for array_name, array in (('states', states), ('actions', actions), ('rewards', rewards),
+                                              ('log_probs', log_probs), ('values', values),
+                                              ('last_value', last_value), ('phi', [phi]),
+                                              ('weights', agent.env.raw_weights)):
+                        shared.write(array_name, array)
+                elif command == 'flows':
+                    agent.envs.get_current_flows(payload)
+                elif command == 'experiment':
+                    # hash function of the worker is a copy, its paths are calculated for the new topology here
+                    agent.env.hash_function.path_calculator.prepare_iteration(payload)
+                    agent.prepare_experiment(payload)
+                else:
+                    raise ValueError(f'Unknown command {command}')
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+            else:
+                connection.send(('done', None))
+    finally:
+        shared.close()
+        connection.close()
+
+
+class RolloutWorkers(object):
+    """
+    Pool of processes that run episodes in parallel.
+
+    Each worker owns num_envs environments of the agent (with different seeds of initial weights) and its own
+        copy of the actor and critic. Before every episode workers receive current weights of the policy,
+        and write the trajectories into shared memory, from where they are read as one batch of environments.
+    Workers are started with spawn, because tensorflow does not work in forked processes.
+    Pool is kept by the agent between experiments: workers are given new flows and topology,
+        and are started again only if the shapes of episodes change
+    """
+
+    def __init__(self, agent, num_workers: int, current_flows):
+        """
+        :param agent: PPOAgent whose environment and settings are copied to workers
+        :param num_workers: number of worker processes
+        :param current_flows: flows of the environments
+        """
+        env = agent.env
+        self.num_workers = num_workers
+        self.num_envs = agent.envs.num_envs
+        self.horizon = agent.horizon
+        self.n_links = env.n_links
+        self.specs = _episode_specs(self.horizon, self.num_envs, env.n_links * agent.actor.num_features,
+                                    env.n_links)
+        self._context = mp.get_context('spawn')
+        self._shared: List[SharedArrays] = []
+        self._connections = []
+        self._processes = []
+        try:
+            for worker in range(num_workers):
+                shared = SharedArrays(self.specs)
+                self._shared.append(shared)
+                settings = environment_settings(env)
+                # topology may be a read-only view, which can not be sent to another process
+                settings['current_topology'] = env.current_topology.copy()
+                settings['current_flows'] = current_flows
+                if env.seed_init_weights is not None:
+                    settings['seed_init_weights'] = env.seed_init_weights + worker * self.num_envs
+                connection, worker_connection = self._context.Pipe()
+                process = self._context.Process(target=_worker_main, daemon=True, args=(worker_connection, {
+                    'environment': settings,
+                    'horizon': self.horizon,
+                    'num_envs': self.num_envs,
+                    'shared_encoder': agent.shared_encoder,
+                    'gin_config': gin.config_str(),
+                    'specs': self.specs,
+                    'shared_memory': shared.name,
+                }))
+                process.start()
+                worker_connection.close()
+                self._connections.append(connection)
+                self._processes.append(process)
+            self._receive_all()
+        except BaseException:
+            self.close()
+            raise
+        LOG.debug(f'Started {num_workers} rollout workers')
+
+    def _receive_all(self) -> None:
+        errors = []
+        for worker, connection in enumerate(self._connections):
+            try:
+                status, message = connection.recv()
+            except EOFError:
+                status, message = 'error', 'worker process exited'
+            if status == 'error':
+                errors.append(f'worker {worker}: {message}')
+        if errors:
+            raise RuntimeError('Rollout workers failed:\n' + '\n'.join(errors))
+
+    def fits(self, agent) -> bool:
+        """
+        True if episodes of agent have the shapes the shared memory of workers was made for
+        """
+        return (agent.horizon, agent.env.n_links, agent.envs.num_envs) == (self.horizon, self.n_links, self.num_envs)
+
+    def _send_all(self, command: str, payload) -> None:
+        for connection in self._connections:
+            connection.send((command, payload))
+        self._receive_all()
+
+    def set_flows(self, current_flows) -> None:
+        """
+        :param current_flows: flows of the environments of all workers
+        """
+        self._send_all('flows', current_flows)
+
+    def prepare_experiment(self, topology) -> None:
+        """
+        Moves agents of workers to a new topology, same as PPOAgent.prepare_experiment
+        """
+        # topology may be a read-only view, which can not be sent to another process
+        self._send_all('experiment', topology.copy())
+
+    def run_episode(self, actor_weights: List[np.ndarray], critic_weights: List[np.ndarray], change_sample: bool):
+        """
+        Runs an episode in every worker with given policy weights
+
+        :return: same as PPOAgent.run_episode, with environments of all workers one after another,
+            and weights of the first environment of the first worker after the episode
+        """
+        self._send_all('run', (actor_weights, critic_weights, change_sample))
+        results = [np.concatenate([shared[array_name] for shared in self._shared], axis=1)
+                   for array_name in ('states', 'actions', 'rewards', 'log_probs', 'values')]
+        last_value = np.concatenate([shared['last_value'] for shared in self._shared])
+        first = self._shared[0]
+        return (*results, last_value, first['phi'][0].item(), first['weights'].copy())
+
+    def close(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        for shared in self._shared:
+            shared.close(unlink=True)
+        self._connections, self._processes, self._shared = [], [], []
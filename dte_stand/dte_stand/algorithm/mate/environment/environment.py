@@ -1,4 +1,4 @@
-import gin.tf
+import gin
 import os
 import copy
 import numpy as np
@@ -10,17 +10,14 @@ import pymetis
 import sys
 sys.path.append('./dte_stand')
 
-from dte_stand.data_structures import HashWeights, Flow, InputData
+from dte_stand.data_structures import HashWeights, CompactHashWeights, Flow, InputData, LinkLoads
+from dte_stand.hash_function.batch import BatchRouting
 from networkx.drawing.nx_agraph import write_dot
 from typing import Optional, Iterable
 
 
-DEFAULT_EDGE_ATTRIBUTES = {
-    'increments': 1,
-    'reductions': 1,
-    'weight': 0.0,
-    'current_bandwidth': 0.0
-}
+DEFAULT_INCREMENTS = 1
+DEFAULT_REDUCTIONS = 1
 
 @gin.configurable
 class Environment(object):
@@ -46,7 +43,10 @@ class Environment(object):
                  graph_dir='dte_stand/algorithm/mate/graphs',
                  base_data_dir='data_examples',
                  topology='huawei.gml',
-                 current_flows=[]):
+                 current_flows=[],
+                 compact_hash_weights=True,
+                 batch_hashing=True,
+                 incremental_routing=True):
 
         env_type = [env for env in env_type.split('+')]
         self.env_type = env_type
@@ -55,6 +55,7 @@ class Environment(object):
         self.topology = topology
         self.base_data_dir = base_data_dir
 
+        self.init_sample = init_sample
         self.num_sample = init_sample - 1
         self.seed_init_weights = seed_init_weights
         self.min_weight = min_weight
@@ -79,36 +80,61 @@ class Environment(object):
         self.base_dir = base_dir
         self.graph_dir = graph_dir
         self.current_topology = current_topology
+        self.compact_hash_weights = compact_hash_weights
+        self.batch_hashing = batch_hashing
+        self.incremental_routing = incremental_routing
         self.initialize_environment()
         self.get_weights()
 
         self.current_flows = current_flows
+        self.flow_batch = None
+        self.batch_result = None
         self.hash_weights: Optional[HashWeights] = None
         self.hash_function = hash_function
         self.prev_edges = []
 
     def calculate_phi(self,  topology: nx.MultiDiGraph):
-        number_of_edges = topology.number_of_edges()
-        average_load: float = 0.0
-        for edge in topology.edges(data=True):
-            _, _, edge_data = edge
-            average_load += float(edge_data['current_bandwidth']) / edge_data['bandwidth']
-        average_load /= number_of_edges
-
-        deviation: float = 0.0
-        for edge in topology.edges(data=True):
-            _, _, edge_data = edge
-            deviation += pow(float(edge_data['current_bandwidth']) / edge_data['bandwidth'] - average_load, 2)
-        return deviation / number_of_edges
+        if topology is self.G:
+            # loads of the environment graph are kept up to date by _calculate_current_bandwidth
+            return self.link_loads.stats().phi
+        return LinkLoads.from_topology(topology).stats().phi
 
     def get_current_flows(self, current_flows):
         self.current_flows = current_flows
+        self.flow_batch = None
+        self.batch_result = None
 
     def _calculate_current_bandwidth(self, topology: nx.MultiDiGraph, flows: Iterable[Flow],
-                                     hash_weights: HashWeights, horizon=None, num_sample=None) -> None:
+                                     hash_weights: HashWeights, horizon=None, num_sample=None,
+                                     changed_node=None) -> None:
+        """
+        :param changed_node: if only bucket weights of this node have changed since the last call,
+            flows are routed again only from this node (when incremental routing is on)
+        """
         if hash_weights is None:
             return
-        self.hash_function.run(topology, flows, hash_weights, False)
+        if self.batch_hashing and self.hash_function.supports_batch:
+            if self.batch_routing is None:
+                link_ids_dict = self.G.nodes()['graph_data']['link_ids_dict']
+                self.batch_routing = BatchRouting(topology, self.hash_function.path_calculator,
+                                                  links=[link_ids_dict[idx] for idx in range(self.n_links)])
+                self.flow_batch = None
+            if self.flow_batch is None:
+                self.flow_batch = self.batch_routing.flow_batch(flows)
+                self.batch_result = None
+            if self.incremental_routing and changed_node is not None and self.batch_result is not None:
+                self.batch_result = self.hash_function.reroute_batch(topology, self.flow_batch, hash_weights,
+                                                                     changed_node, self.batch_result,
+                                                                     routing=self.batch_routing,
+                                                                     update_topology=False)
+            else:
+                self.batch_result = self.hash_function.run_batch(topology, self.flow_batch, hash_weights,
+                                                                 routing=self.batch_routing,
+                                                                 update_topology=False)
+            self.link_loads.set_loads(self.batch_result.link_loads)
+        else:
+            self.hash_function.run(topology, flows, hash_weights, False)
+            self.link_loads.read_loads(topology)
 
         '''
         edges = []
@@ -194,7 +220,8 @@ class Environment(object):
         return self.get_state()
 
     def generate_graph(self):
-        G = copy.deepcopy(self.topology_object)
+        # topology may be a read-only view, copy makes a graph that can be changed
+        G = self.topology_object.copy()
         #for i, j, m in G.edges:
         #    print()
         self.n_nodes = G.number_of_nodes()
@@ -205,12 +232,21 @@ class Environment(object):
         for i, j, m in G.edges:
             G[i][j][m]['label'] = G[i][j][m]['id']
             G[i][j][m]['id'] = idx
-            G[i][j][m]['increments'] = 1
-            G[i][j][m]['reductions'] = 1
-            G[i][j][m]['weight'] = copy.deepcopy(self.init_weights[idx])
             link_ids_dict[idx] = (i, j, m)
             idx += 1
         self.G = G
+        # graph keeps only the structure, changing state of links is kept in arrays indexed by link id
+        links = [link_ids_dict[idx] for idx in range(self.n_links)]
+        self.link_loads = LinkLoads(links, [G.edges[link]['bandwidth'] for link in links])
+        self.raw_weights = np.array(self.init_weights, dtype=np.float32)
+        self.increments = np.full(self.n_links, DEFAULT_INCREMENTS, dtype=np.float32)
+        self.reductions = np.full(self.n_links, DEFAULT_REDUCTIONS, dtype=np.float32)
+        self.weights = np.zeros(self.n_links, dtype=np.float32)
+        self.link_traffic = np.zeros(self.n_links, dtype=np.float32)
+        self._state = np.zeros(self.n_links * self.num_features, dtype=np.float32)
+        # hash weights and routing arrays are bound to links of the graph, so they are created again for the new graph
+        self.hash_weights = None
+        self.batch_routing = None
         incoming_links, outcoming_links = self._generate_link_indices_and_adjacencies(self.G.nodes)
         #print("LINK IDS DICT", link_ids_dict)
         self.G.add_node('graph_data', link_ids_dict=link_ids_dict, incoming_links=incoming_links,
@@ -242,54 +278,50 @@ class Environment(object):
 
     def set_target_measure(self):
         self.target_reward_measure = copy.deepcopy(self.reward_measure)
-        self.target_link_traffic = copy.deepcopy(self.link_traffic)
+        self.target_link_traffic = self.link_traffic.copy()
         self.get_weights()
-        self.target_weights = copy.deepcopy(self.raw_weights)
+        self.target_weights = self.raw_weights.copy()
 
     def get_weights(self):
-        weights = [0.0] * self.n_links
-        for i, j, m in self.G.edges(keys=True):
-            weights[self.G.get_edge_data(i, j, m)['id']] = copy.deepcopy(self.G.get_edge_data(i, j, m)[
-                "weight"])
-        self.raw_weights = weights
-        max_weight = self.max_weight * 3
-        self.weights = [weight / max_weight for weight in weights]
+        # normalized weights of links, raw_weights are changed in place by update_weights
+        np.divide(self.raw_weights, self.max_weight * 3, out=self.weights)
 
     def get_state(self):
-        state = []
-        link_traffic = copy.deepcopy(self.link_traffic)
-        weights = copy.deepcopy(self.weights)
-        if self.link_traffic:
-            state += link_traffic
+        """
+        State is written into the same buffer on every call, copy it to keep it after the next step
+        """
+        parts = []
+        if self.link_traffic_to_states:
+            parts.append(self.link_traffic)
         if self.weigths_to_states:
-            state += weights
+            parts.append(self.weights)
         if self.probs_to_states:
-            state += self.p_in
-            state += self.p_out
-        return np.array(state, dtype=np.float32)
+            parts += [self.p_in, self.p_out]
+        return np.concatenate(parts, out=self._state)
 
     def update_weights(self, link, action_value, get_state_back=False):
-        i, j, m = link
+        link_id = self.G.edges[link]['id']
+        weights = self.raw_weights
         if self.weight_update == 'min_max':
             if action_value == 0:
-                self.G[i][j][m]['weight'] = max(
-                    self.G[i][j][m]['weight'] - self.weight_change, self.min_weight)
+                weights[link_id] = max(weights[link_id] - self.weight_change, self.min_weight)
             elif action_value == 1:
-                self.G[i][j][m]['weight'] = min(
-                    self.G[i][j][m]['weight'] + self.weight_change, self.max_weight)
+                weights[link_id] = min(weights[link_id] + self.weight_change, self.max_weight)
         else:
             if self.weight_update == 'increment_reduction':
                 if action_value == 0:
-                    self.G[i][j][m]['reductions'] += 1
+                    self.reductions[link_id] += 1
                 elif action_value == 1:
-                    self.G[i][j][m]['increments'] += 1
-                self.G[i][j][m]['weight'] = self.G[i][j][m]['increments'] / \
-                    self.G[i][j][m]['reductions']
+                    self.increments[link_id] += 1
+                weights[link_id] = self.increments[link_id] / self.reductions[link_id]
             elif self.weight_update == 'sum':
                 if get_state_back:
-                    self.G[i][j][m]['weight'] -= self.weight_change
+                    weights[link_id] -= self.weight_change
                 else:
-                    self.G[i][j][m]['weight'] += self.weight_change
+                    weights[link_id] += self.weight_change
+        if self.compact_hash_weights and self.hash_weights is not None:
+            # weight of an edge is shared by all destinations, so only one value has to be updated
+            self.hash_weights.set_link_weight(link_id, weights[link_id].item())
 
     def reinitialize_routing(self, routing):
         self.routing = routing
@@ -302,8 +334,12 @@ class Environment(object):
         link = self.G.nodes()['graph_data']['link_ids_dict'][action]
         self.update_weights(link, 0, step_back)
         self.get_weights()
-        self._get_HashWeights()
-        self._calculate_current_bandwidth(self.G, self.current_flows, self.hash_weights, horizon, num_sample)
+        if not self.compact_hash_weights:
+            # compact hash weights are already updated by update_weights
+            self._get_HashWeights()
+        # only buckets of the link's start node have changed
+        self._calculate_current_bandwidth(self.G, self.current_flows, self.hash_weights, horizon, num_sample,
+                                          changed_node=link[0])
         state = self.get_state()
         reward = self._compute_reward()
         return state, reward
@@ -357,27 +393,23 @@ class Environment(object):
 
     def _reset_edge_attributes(self, attributes=None):
         if attributes is None:
-            attributes = list(DEFAULT_EDGE_ATTRIBUTES.keys())
+            attributes = ['increments', 'reductions', 'weight', 'current_bandwidth']
         if type(attributes) != list:
             attributes = [attributes]
-        for i, j, m in self.G.edges:
-            for attribute in attributes:
-                if attribute == 'weight':
-                    self.G[i][j][m][attribute] = copy.deepcopy(
-                        self.init_weights[self.G[i][j][m]['id']])
-                else:
-                    self.G[i][j][m][attribute] = copy.deepcopy(DEFAULT_EDGE_ATTRIBUTES[attribute])
-
-    def _normalize_traffic(self):
-        for i, j, m in self.G.edges:
-            self.link_traffic[self.G[i][j][m]['id']] /= self.G[i][j][m]['bandwidth']
+        for attribute in attributes:
+            if attribute == 'increments':
+                self.increments[:] = DEFAULT_INCREMENTS
+            elif attribute == 'reductions':
+                self.reductions[:] = DEFAULT_REDUCTIONS
+            elif attribute == 'weight':
+                self.raw_weights[:] = self.init_weights
+            elif attribute == 'current_bandwidth':
+                self.link_loads.loads[:] = 0
 
     def _get_link_traffic(self):
-        link_traffic = [0] * self.n_links
-        for i, j, m in self.G.edges:
-            link_traffic[self.G[i][j][m]['id']] = self.G[i][j][m]['current_bandwidth']
-        self.link_traffic = link_traffic
-        self._normalize_traffic()
+        # utilization of links indexed by link id
+        link_traffic = self.link_loads.utilization()
+        np.copyto(self.link_traffic, link_traffic, casting='same_kind')
         self.mean_traffic = np.mean(link_traffic)
         self.get_weights()
 
@@ -409,6 +441,13 @@ class Environment(object):
         return reward
 
     def _get_HashWeights(self):
+        if self.compact_hash_weights:
+            if self.hash_weights is None:
+                self.hash_weights = CompactHashWeights(self.G.nodes()['graph_data']['link_ids_dict'],
+                                                       self.raw_weights)
+            else:
+                self.hash_weights.weight_vector[:] = self.raw_weights
+            return
         hash_weights = HashWeights()
         topo_nodes = self.G.nodes()
         for start_node in topo_nodes:
@@ -422,7 +461,6 @@ class Environment(object):
                     continue
                 for edge in node_edges:
                     edge_start, edge_end, edge_index = edge
-                    edge_weight = (self.G.get_edge_data(edge_start, edge_end, edge_index)[
-                        "weight"])
+                    edge_weight = self.raw_weights[self.G.edges[edge_start, edge_end, edge_index]['id']].item()
                     hash_weights.put(edge_start, end_node, edge_end, edge_index, edge_weight)
         self.hash_weights = hash_weights
\ No newline at end of file
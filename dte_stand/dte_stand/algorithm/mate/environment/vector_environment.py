@@ -0,0 +1,115 @@
+import numpy as np
+from typing import List, Optional, Sequence
+
+from dte_stand.algorithm.mate.environment.environment import Environment
+
+
+def environment_settings(env: Environment) -> dict:
+    """
+    Arguments that create an environment with the same settings as env
+    """
+    return dict(current_topology=env.current_topology,
+                hash_function=env.hash_function,
+                env_type='+'.join(env.env_type),
+                traffic_profile=env.traffic_profile,
+                routing=env.routing,
+                seed_init_weights=env.seed_init_weights,
+                min_weight=env.min_weight,
+                max_weight=env.max_weight,
+                weight_change=env.weight_change,
+                weight_update=env.weight_update,
+                weigths_to_states=env.weigths_to_states,
+                link_traffic_to_states=env.link_traffic_to_states,
+                probs_to_states=env.probs_to_states,
+                reward_magnitude=env.reward_magnitude,
+                base_reward=env.base_reward,
+                reward_computation=env.reward_computation,
+                current_flows=env.current_flows,
+                compact_hash_weights=env.compact_hash_weights,
+                batch_hashing=env.batch_hashing,
+                incremental_routing=env.incremental_routing)
+
+
+class VectorEnvironment(object):
+    """
+    Several independent environments stepped in lockstep, so that the agent
+        chooses actions for all of them with one call on a batch of states.
+
+    Environments may differ in initial weights, flows or topology,
+        but must have the same number of links and state features
+    """
+
+    def __init__(self, envs: Sequence[Environment]):
+        if not envs:
+            raise ValueError('Vector environment needs at least one environment')
+        self.envs = list(envs)
+        self.update_links()
+
+    def update_links(self) -> None:
+        """
+        Reads the number of links of the environments again, after they have moved to another topology
+        """
+        self.n_links = self.envs[0].n_links
+        self.num_features = self.envs[0].num_features
+        for env in self.envs[1:]:
+            if env.n_links != self.n_links or env.num_features != self.num_features:
+                raise ValueError(f'All environments must have {self.n_links} links and {self.num_features} features, '
+                                 f'got {env.n_links} links and {env.num_features} features')
+        self._states = np.zeros((len(self.envs), self.n_links * self.num_features), dtype=np.float32)
+        self._rewards = np.zeros(len(self.envs), dtype=np.float32)
+
+    @classmethod
+    def from_environment(cls, env: Environment, num_envs: int,
+                         seeds: Optional[Sequence[Optional[int]]] = None) -> 'VectorEnvironment':
+        """
+        :param env: first environment, the others are created with the same settings
+        :param num_envs: number of environments including env
+        :param seeds: seeds of initial weights of the other environments.
+            By default, seeds following the seed of env, or random weights if env has no seed
+        """
+        if seeds is None:
+            seeds = [None if env.seed_init_weights is None else env.seed_init_weights + k
+                     for k in range(1, num_envs)]
+        envs = [env]
+        for seed in seeds:
+            envs.append(Environment(**dict(environment_settings(env), seed_init_weights=seed)))
+        return cls(envs)
+
+    @property
+    def num_envs(self) -> int:
+        return len(self.envs)
+
+    def get_current_flows(self, current_flows, per_env: bool = False):
+        """
+        :param current_flows: flows for all environments, or a list of flows for each environment if per_env
+        """
+        for k, env in enumerate(self.envs):
+            env.get_current_flows(current_flows[k] if per_env else current_flows)
+
+    def get_state(self) -> np.ndarray:
+        """
+        States of all environments as rows of one buffer, it is overwritten on every call
+        """
+        for k, env in enumerate(self.envs):
+            self._states[k] = env.get_state()
+        return self._states
+
+    def reset(self, change_sample=False) -> np.ndarray:
+        for env in self.envs:
+            env.reset(change_sample=change_sample)
+        if change_sample:
+            # next sample may be of another topology
+            self.update_links()
+        return self.get_state()
+
+    def step(self, actions: np.ndarray):
+        """
+        :param actions: action for each environment
+        :return: states and rewards of all environments, in buffers that are overwritten by the next step
+        """
+        for k, (env, action) in enumerate(zip(self.envs, actions)):
+            self._states[k], self._rewards[k] = env.step(action)
+        return self._states, self._rewards
+
+    def calculate_phi(self) -> List[float]:
+        return [env.calculate_phi(env.G) for env in self.envs]
@@ -3,9 +3,14 @@ import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 
+from dte_stand.algorithm.mate.lib.graph_inputs import PaddedGraph
+
+# logit of padding links, their probability is zero
+PADDING_LOGIT = -1e9
+
 
 @gin.configurable
-class Actor(keras.Sequential):
+class Actor(keras.Model):
     def __init__(self,
                  graph,
                  num_actions=1,
@@ -30,13 +35,9 @@ class Actor(keras.Sequential):
         self.message_iterations = message_iterations
 
         # FIXED INPUTS
-        #print("GRAPH DATA", graph.nodes()['graph_data'])
-        #self.incoming_links = graph.nodes()['subgraph-0']['incoming_links']
-        #self.outcoming_links = graph.nodes()['subgraph-0']['outcoming_links']
-        self.incoming_links = graph.nodes()['graph_data']['incoming_links']
-        self.outcoming_links = graph.nodes()['graph_data']['outcoming_links']
-        #print("INCOMING LINKS", self.incoming_links)
-        #print("OUTCOMING LINKS", self.outcoming_links)
+        # links are padded to a bucket size and given to compiled functions as tensors,
+        #     so the same traced functions work for every topology of the bucket
+        self.set_graph(graph)
 
         # NEURAL NETWORKS
         self.hidden_layer_initializer = tf.keras.initializers.Orthogonal(gain=np.sqrt(2))
@@ -91,39 +92,82 @@ class Actor(keras.Sequential):
         self.readout.build(input_shape=[None, self.link_state_size])
         self.built = True
 
+    def set_graph(self, graph):
+        """
+        Sets the topology of states given to call. Networks do not depend on the topology, so weights are kept
+
+        :param graph: graph of the environment
+        """
+        self.graph = PaddedGraph(graph, self.num_features)
+        self.n_links = self.graph.n_links
+
     @tf.function
-    def message_passing(self, input):
+    def message_passing(self, input, graph):
+        """
+        :param input: states padded to the bucket of graph, of shape [batch, num_features * n_padded]
+        :param graph: GraphInputs of the topology
+        :return: link states of shape [batch, n_padded, link_state_size]
+        """
+        n_padded = graph.link_mask.shape[0]
         input_tensor = tf.convert_to_tensor(input)
-        link_states = tf.reshape(input_tensor, [self.num_features, self.n_links])
-        link_states = tf.transpose(link_states)
-        padding = [[0, 0], [0, self.link_state_size - self.num_features]]
+        link_states = tf.reshape(input_tensor, [-1, self.num_features, n_padded])
+        link_states = tf.transpose(link_states, [0, 2, 1])
+        padding = [[0, 0], [0, 0], [0, self.link_state_size - self.num_features]]
         link_states = tf.pad(link_states, padding)
         for _ in range(self.message_iterations):
-            incoming_link_states = tf.gather(link_states, self.incoming_links)
-            outcoming_link_states = tf.gather(link_states, self.outcoming_links)
-            message_inputs = tf.cast(tf.concat([incoming_link_states, outcoming_link_states], axis=1), tf.float32)
+            incoming_link_states = tf.gather(link_states, graph.incoming_links, axis=1)
+            outcoming_link_states = tf.gather(link_states, graph.outcoming_links, axis=1)
+            message_inputs = tf.cast(tf.concat([incoming_link_states, outcoming_link_states], axis=2), tf.float32)
             messages = self.create_message(message_inputs)
-            aggregated_messages = self.message_aggregation(messages)
-            link_update_input = tf.cast(tf.concat([link_states, aggregated_messages], axis=1), tf.float32)
+            aggregated_messages = self.message_aggregation(messages, graph)
+            link_update_input = tf.cast(tf.concat([link_states, aggregated_messages], axis=2), tf.float32)
             link_states = self.link_update(link_update_input)
         return link_states
 
     @tf.function
-    def message_aggregation(self, messages):
+    def message_aggregation(self, messages, graph):
+        n_padded = graph.link_mask.shape[0]
+        # segment operations aggregate the first axis, so links go first and batch second
+        messages = tf.transpose(messages, [1, 0, 2])
+        # messages of padding pairs go to the extra last segment, which is dropped
         if self.aggregation == 'sum':
-            aggregated_messages = tf.math.unsorted_segment_sum(messages, self.outcoming_links,
-                                                               num_segments=self.n_links)
+            aggregated_messages = tf.math.unsorted_segment_sum(messages, graph.segment_ids,
+                                                               num_segments=n_padded + 1)[:n_padded]
         elif self.aggregation == 'min_max':
-            agg_max = tf.math.unsorted_segment_max(messages, self.outcoming_links, num_segments=self.n_links)
-            agg_min = tf.math.unsorted_segment_min(messages, self.outcoming_links, num_segments=self.n_links)
-            aggregated_messages = tf.concat([agg_max, agg_min], axis=1)
-        return aggregated_messages
+            agg_max = tf.math.unsorted_segment_max(messages, graph.segment_ids, num_segments=n_padded + 1)
+            agg_min = tf.math.unsorted_segment_min(messages, graph.segment_ids, num_segments=n_padded + 1)
+            aggregated_messages = tf.concat([agg_max[:n_padded], agg_min[:n_padded]], axis=2)
+        # padding links get no messages, zeros replace extreme values of their empty segments
+        aggregated_messages = tf.where(graph.link_mask[:, None, None], aggregated_messages, 0.)
+        return tf.transpose(aggregated_messages, [1, 0, 2])
 
-    @tf.function
-    def call(self, input):
-        link_states = self.message_passing(input)
-        #print("LINK STATES", link_states)
-        policy = self.readout(link_states)
-        policy = tf.reshape(policy, [-1])
-        #print("POLICY", policy)
-        return policy
\ No newline at end of file
+    def call(self, input, training=None):
+        """
+        :param input: one state or a batch of states of the topology set by set_graph,
+            of shape [batch, num_features * n_links]
+        :return: logits of links, of shape [n_links] for one state and [batch, n_links] for a batch
+        """
+        input = tf.convert_to_tensor(input)
+        states = tf.reshape(input, [-1, self.num_features, self.n_links])
+        states = tf.pad(states, [[0, 0], [0, 0], [0, self.graph.n_padded - self.n_links]])
+        states = tf.reshape(states, [-1, self.num_features * self.graph.n_padded])
+        policy = self.logits(states, self.graph.inputs, training=training)[:, :self.n_links]
+        if input.shape.rank == 1:
+            policy = tf.reshape(policy, [-1])
+        return policy
+
+    def logits(self, input, graph, training=None):
+        """
+        :param input: states padded to the bucket of graph, of shape [batch, num_features * n_padded]
+        :return: logits of links, of shape [batch, n_padded]
+        """
+        return self.readout_logits(self.message_passing(input, graph), graph, training=training)
+
+    def readout_logits(self, link_states, graph, training=None):
+        """
+        :param link_states: result of message passing, of shape [batch, n_padded, link_state_size]
+        :return: logits of links, of shape [batch, n_padded], padding links are never chosen
+        """
+        policy = self.readout(link_states, training=training)
+        policy = tf.reshape(policy, [-1, graph.link_mask.shape[0]])
+        return tf.where(graph.link_mask, policy, PADDING_LOGIT)
@@ -0,0 +1,77 @@
+import gin.tf
+import numpy as np
+import tensorflow as tf
+from typing import NamedTuple
+
+
+class GraphInputs(NamedTuple):
+    """
+    Links of a topology as tensors of a fixed bucket size, passed to compiled functions of actor and critic
+
+    incoming_links, outcoming_links - links of each pair of adjacent links, padding pairs point to link 0
+    segment_ids - link that receives the message of each pair, n_padded for padding pairs, so their messages
+        go to an extra segment that is dropped
+    link_mask - true for links of the topology, false for padding links
+    """
+    incoming_links: tf.Tensor
+    outcoming_links: tf.Tensor
+    segment_ids: tf.Tensor
+    link_mask: tf.Tensor
+
+
+def bucket_size(size: int, min_size: int) -> int:
+    """
+    smallest power of two that is not less than size and min_size
+    """
+    bucket = max(min_size, 1)
+    while bucket < size:
+        bucket *= 2
+    return bucket
+
+
+@gin.configurable
+class PaddedGraph(object):
+    """
+    Topology padded to bucket sizes of links and of pairs of adjacent links.
+
+    Compiled functions are traced once for each bucket instead of each topology: all topologies
+        with the same buckets use one graph, because their links are given as tensor inputs of the same shape.
+        Padding links are appended after the links of the topology and are masked out of results
+    """
+
+    def __init__(self, graph, num_features: int, min_links: int = 16, min_pairs: int = 64):
+        """
+        :param graph: graph of the environment, with link adjacency in the 'graph_data' node
+        :param num_features: number of features of each link in the state
+        :param min_links: smallest bucket of links
+        :param min_pairs: smallest bucket of pairs of adjacent links
+        """
+        incoming_links = np.asarray(graph.nodes()['graph_data']['incoming_links'], dtype=np.int32)
+        outcoming_links = np.asarray(graph.nodes()['graph_data']['outcoming_links'], dtype=np.int32)
+        self.num_features = num_features
+        self.incoming_links = incoming_links
+        self.outcoming_links = outcoming_links
+        self.n_links = graph.number_of_edges()
+        self.n_padded = bucket_size(self.n_links, min_links)
+        n_pairs = bucket_size(len(incoming_links), min_pairs)
+
+        padding = n_pairs - len(incoming_links)
+        segment_ids = np.concatenate([outcoming_links, np.full(padding, self.n_padded, dtype=np.int32)])
+        self.inputs = GraphInputs(
+            incoming_links=tf.constant(np.pad(incoming_links, (0, padding))),
+            outcoming_links=tf.constant(np.pad(outcoming_links, (0, padding))),
+            segment_ids=tf.constant(segment_ids),
+            link_mask=tf.constant(np.arange(self.n_padded) < self.n_links))
+
+    def pad_states(self, states: np.ndarray) -> np.ndarray:
+        """
+        :param states: states of environments of shape [..., num_features * n_links]
+        :return: states of shape [..., num_features * n_padded], features of padding links are zero
+        """
+        states = np.asarray(states, dtype=np.float32)
+        if self.n_padded == self.n_links:
+            return states
+        batch_shape = states.shape[:-1]
+        padded = np.zeros(batch_shape + (self.num_features, self.n_padded), dtype=np.float32)
+        padded[..., :self.n_links] = states.reshape(batch_shape + (self.num_features, self.n_links))
+        return padded.reshape(batch_shape + (self.num_features * self.n_padded,))
@@ -0,0 +1,161 @@
+import json
+import numpy as np
+from typing import Dict, List, Tuple
+
+# networks of the actor in the order they are applied
+NETWORKS = ('create_message', 'link_update', 'readout')
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+}
+
+
+def export_actor(actor, path: str) -> None:
+    """
+    Saves dense layers of the actor and link adjacency of its topology into one .npz file,
+        that NumpyActor reads without tensorflow. Dropout layers are left out, they do nothing in inference
+
+    :param actor: trained Actor
+    :param path: path of the .npz file
+    """
+    arrays = {}
+    layers = {}
+    for network in NETWORKS:
+        layers[network] = []
+        for layer in getattr(actor, network).layers:
+            if not hasattr(layer, 'kernel'):
+                continue
+            kernel, bias = layer.get_weights()
+            arrays[f'{network}/{len(layers[network])}/kernel'] = kernel
+            arrays[f'{network}/{len(layers[network])}/bias'] = bias
+            layers[network].append(layer.activation.__name__)
+    config = {
+        'num_features': actor.num_features,
+        'link_state_size': actor.link_state_size,
+        'aggregation': actor.aggregation,
+        'message_iterations': actor.message_iterations,
+        'n_links': actor.graph.n_links,
+        'activations': layers,
+    }
+    arrays['incoming_links'] = actor.graph.incoming_links
+    arrays['outcoming_links'] = actor.graph.outcoming_links
+    arrays['config'] = np.array(json.dumps(config))
+    np.savez(path, **arrays)
+
+
+class NumpyActor(object):
+    """
+    Actor exported by export_actor, that runs message passing and readout with numpy only.
+
+    Gives the same logits as Actor, and chooses links greedily
+    """
+
+    def __init__(self, layers: Dict[str, List[Tuple[np.ndarray, np.ndarray, str]]], num_features: int,
+                 link_state_size: int, aggregation: str, message_iterations: int,
+                 incoming_links: np.ndarray, outcoming_links: np.ndarray, n_links: int):
+        """
+        :param layers: kernel, bias and activation name of each dense layer of each network
+        :param incoming_links: links of each pair of adjacent links sending messages
+        :param outcoming_links: links of each pair of adjacent links receiving messages
+        """
+        for network in NETWORKS:
+            for _, _, activation in layers[network]:
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f'Activation {activation} of {network} is not supported')
+        if aggregation not in ('sum', 'min_max'):
+            raise ValueError(f'Aggregation {aggregation} is not supported')
+        self.layers = layers
+        self.num_features = num_features
+        self.link_state_size = link_state_size
+        self.aggregation = aggregation
+        self.message_iterations = message_iterations
+        self.set_links(incoming_links, outcoming_links, n_links)
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyActor':
+        """
+        :param path: .npz file written by export_actor
+        """
+        with np.load(path) as arrays:
+            config = json.loads(arrays['config'].item())
+            layers = {network: [(arrays[f'{network}/{k}/kernel'], arrays[f'{network}/{k}/bias'], activation)
+                                for k, activation in enumerate(config['activations'][network])]
+                      for network in NETWORKS}
+            return cls(layers, num_features=config['num_features'], link_state_size=config['link_state_size'],
+                       aggregation=config['aggregation'], message_iterations=config['message_iterations'],
+                       incoming_links=arrays['incoming_links'], outcoming_links=arrays['outcoming_links'],
+                       n_links=config['n_links'])
+
+    def set_graph(self, graph) -> None:
+        """
+        Sets another topology, networks do not depend on it
+
+        :param graph: graph of the environment, with link adjacency in the 'graph_data' node
+        """
+        self.set_links(graph.nodes()['graph_data']['incoming_links'], graph.nodes()['graph_data']['outcoming_links'],
+                       graph.number_of_edges())
+
+    def set_links(self, incoming_links, outcoming_links, n_links: int) -> None:
+        self.n_links = n_links
+        self.incoming_links = np.asarray(incoming_links, dtype=np.int64)
+        self.outcoming_links = np.asarray(outcoming_links, dtype=np.int64)
+        # messages are sorted by the link they go to, so each link aggregates a contiguous slice
+        self._message_order = np.argsort(self.outcoming_links, kind='stable')
+        self._receivers, self._slice_starts = np.unique(self.outcoming_links[self._message_order], return_index=True)
+
+    def _apply(self, network: str, x: np.ndarray) -> np.ndarray:
+        # min_max aggregation of links without messages gives float32 min and max sentinels, as empty segments
+        # of tensorflow do, so matmul may overflow to inf there the same way it does in the actor
+        with np.errstate(over='ignore'):
+            for kernel, bias, activation in self.layers[network]:
+                x = ACTIVATIONS[activation](x @ kernel + bias)
+        return x
+
+    def _aggregate(self, messages: np.ndarray) -> np.ndarray:
+        messages = messages[:, self._message_order]
+        shape = (len(messages), self.n_links, messages.shape[2])
+        # links without messages get the same values as empty segments of tensorflow segment operations
+        if self.aggregation == 'sum':
+            aggregated = np.zeros(shape, dtype=np.float32)
+            if messages.shape[1]:
+                aggregated[:, self._receivers] = np.add.reduceat(messages, self._slice_starts, axis=1)
+            return aggregated
+        agg_max = np.full(shape, np.finfo(np.float32).min, dtype=np.float32)
+        agg_min = np.full(shape, np.finfo(np.float32).max, dtype=np.float32)
+        if messages.shape[1]:
+            agg_max[:, self._receivers] = np.maximum.reduceat(messages, self._slice_starts, axis=1)
+            agg_min[:, self._receivers] = np.minimum.reduceat(messages, self._slice_starts, axis=1)
+        return np.concatenate([agg_max, agg_min], axis=2)
+
+    def message_passing(self, states: np.ndarray) -> np.ndarray:
+        """
+        :param states: states of shape [batch, num_features * n_links]
+        :return: link states of shape [batch, n_links, link_state_size]
+        """
+        states = np.asarray(states, dtype=np.float32)
+        link_states = states.reshape(-1, self.num_features, self.n_links).transpose(0, 2, 1)
+        link_states = np.pad(link_states, [(0, 0), (0, 0), (0, self.link_state_size - self.num_features)])
+        for _ in range(self.message_iterations):
+            message_inputs = np.concatenate([link_states[:, self.incoming_links],
+                                             link_states[:, self.outcoming_links]], axis=2)
+            messages = self._apply('create_message', message_inputs)
+            link_states = self._apply('link_update', np.concatenate([link_states, self._aggregate(messages)], axis=2))
+        return link_states
+
+    def logits(self, states: np.ndarray) -> np.ndarray:
+        """
+        :param states: one state or a batch of states of shape [batch, num_features * n_links]
+        :return: logits of links, of shape [n_links] for one state and [batch, n_links] for a batch
+        """
+        states = np.asarray(states, dtype=np.float32)
+        logits = self._apply('readout', self.message_passing(states)).reshape(-1, self.n_links)
+        return logits.reshape(-1) if states.ndim == 1 else logits
+
+    def act(self, state: np.ndarray) -> int:
+        """
+        link with the largest logit, as the actor chooses with select_max
+        """
+        return int(np.argmax(self.logits(state)))
@@ -23,6 +23,7 @@ class Runner(object):
 
         self.save_checkpoints = save_checkpoints
         self.hash_function = hash_function
+        self.experiments = 0
         env = Environment(topology_object, self.hash_function)
         agent = PPOAgent
         if algorithm == 'PPO':
@@ -37,11 +38,19 @@ class Runner(object):
         self.set_logs_and_checkpoints()
 
     def run_experiment(self, topology, current_flows, iteration):
+        if self.experiments:
+            # agent trained in an earlier experiment continues with its networks and optimizer
+            self.agent.prepare_experiment(topology)
+        self.experiments += 1
         hash_weights, phi_dict = self.agent.train_and_evaluate(topology, current_flows, self.hash_function, iteration)
         #return hash_weights, phi_dict
         print("PHI DCT RETURNED", phi_dict)
         return hash_weights, phi_dict
 
+    def close(self):
+        # rollout workers of the agent are kept between experiments, until the runner is closed
+        self.agent.close_rollout_workers()
+
     def set_logs_and_checkpoints(self):
         experiment_identifier = self.agent.set_experiment_identifier(self.only_eval)
         writer_dir = os.path.join(self.base_dir, experiment_identifier)
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def gae_advantages(rewards, values, last_values, gamma, gae_lambda, dones=None):
+    """
+    Generalized advantage estimation for trajectories of several environments at once
+
+    Advantages are a reverse discounted scan of TD errors over time, done for all environments with one
+        array operation per step. Where an episode ends, neither the TD error nor the scan crosses the boundary
+
+    :param rewards: rewards of shape [num_envs, horizon]
+    :param values: values of visited states of shape [num_envs, horizon]
+    :param last_values: values of states after the last step, shape [num_envs].
+        Trajectories cut by the horizon are bootstrapped with them
+    :param dones: dones[k, t] is true if episode of k-th environment ended with step t,
+        so the next state belongs to a new episode. No episode ends inside the trajectories if not given
+    :return: returns and advantages of shape [num_envs, horizon]
+    """
+    rewards = np.asarray(rewards, dtype=np.float32)
+    values = np.asarray(values, dtype=np.float32)
+    last_values = np.asarray(last_values, dtype=np.float32)
+    next_values = np.concatenate([values[:, 1:], last_values[:, None]], axis=1)
+    if dones is None:
+        not_done = np.ones_like(rewards)
+    else:
+        not_done = 1.0 - np.asarray(dones, dtype=np.float32)
+    deltas = rewards + gamma * next_values * not_done - values
+    decays = (gamma * gae_lambda) * not_done
+
+    # time-major copies, so that every step of the scan reads and writes contiguous rows
+    deltas, decays = np.ascontiguousarray(deltas.T), np.ascontiguousarray(decays.T)
+    advantages = np.empty_like(deltas)
+    last_advantage = np.zeros(deltas.shape[1], dtype=np.float32)
+    for t in reversed(range(len(deltas))):
+        np.multiply(decays[t], last_advantage, out=last_advantage)
+        np.add(deltas[t], last_advantage, out=last_advantage)
+        advantages[t] = last_advantage
+    advantages = advantages.T
+    return values + advantages, advantages
@@ -1,28 +1,49 @@
 import networkx
 from dte_stand.algorithm.base import BaseAlgorithm
 from dte_stand.data_structures import HashWeights, Flow
+from dte_stand.hash_function.base import BaseHashFunction
 from dte_stand.algorithm.mate.lib.run_experiment import Runner
 import dill
-import time
 
 import logging
 LOG = logging.getLogger(__name__)
 
-from typing import List
+from typing import Dict, List
 
 class MateAlgorithm(BaseAlgorithm):
-    def step(self, topology: networkx.MultiDiGraph, flows: List[Flow], iteration, i) -> HashWeights:
+    """
+    Agent of each subgraph is kept between steps, so networks, optimizer state, environments
+        and logs are created once, and every step only trains on new topology and flows.
+        Topology may change links, networks are given the links of the new one
+    """
+    def __init__(self, hash_function: BaseHashFunction):
+        super().__init__(hash_function)
+        self._runners: Dict[int, Runner] = {}
+
+    def _get_runner(self, topology: networkx.MultiDiGraph, iteration, i) -> Runner:
+        runner = self._runners.get(i)
+        if runner is None:
+            # without an agent in memory, agent trained by an earlier run is loaded after the first iteration
+            runner = Runner(topology, self.hash_function, iteration != 0)
+            self._runners[i] = runner
+        return runner
+
+    def close(self):
+        """
+        Stops rollout workers of all agents
+        """
+        for runner in self._runners.values():
+            runner.close()
+        self._runners = {}
+
+    def step(self, topology: networkx.MultiDiGraph, flows: List[Flow], iteration, i=0) -> HashWeights:
         #print(topology.nodes, topology.edges)
         #print("MARL FLOWS", flows)
         phi_dict = {}
-        time.sleep(2)
-        LOG.debug('Running dummy algorithm')
-        if iteration == 0:
-            hash_weights, phi_dict = Runner(topology, self.hash_function, False).run_experiment(topology, flows, iteration)
-        else:
-            hash_weights, phi_dict = Runner(topology, self.hash_function, True).run_experiment(topology, flows, iteration)
+        LOG.debug('Running mate algorithm')
+        hash_weights, phi_dict = self._get_runner(topology, iteration, i).run_experiment(topology, flows, iteration)
 
         with open("hw-" + str(i) + "-pickle", "wb") as f:
             dill.dump(hash_weights, f)
 
-        return phi_dict
\ No newline at end of file
+        return phi_dict
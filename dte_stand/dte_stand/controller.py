@@ -1,5 +1,5 @@
 import networkx
-from dte_stand.data_structures import HashWeights, Flow, InputData
+from dte_stand.data_structures import HashWeights, Flow, InputData, LinkLoads
 from dte_stand.hash_function.base import BaseHashFunction
 from dte_stand.algorithm.base import BaseAlgorithm
 from dte_stand.paths.base import BasePathCalculator
@@ -7,9 +7,7 @@ from typing import Optional, Tuple, List
 #import matplotlib.pyplot as plt
 import cProfile
 import pstats
-import pymetis
 import numpy as np
-import copy
 import multiprocessing as mp
 import dill
 import random
@@ -36,10 +34,12 @@ class ExperimentController:
         # result_list is modified only by the main process, not the pool workers.
         self.result_list.append(result)
 
-    def _get_current_topology_and_time(self, current_time: int) -> Tuple[networkx.MultiDiGraph, int]:
+    def _get_current_topology_and_time(self, current_time: int,
+                                       mutable: bool = False) -> Tuple[networkx.MultiDiGraph, int]:
         # get topology and time when topology last changed
+        # topology is a read-only view unless mutable is set, see Topology.get
         #print(current_time, type(current_time))
-        current_topology, change_time = self.input_data.topology.get(current_time + self.period)
+        current_topology, change_time = self.input_data.topology.get(current_time + self.period, mutable=mutable)
 
         # if topology changed between (current_time, current_time+period),
         # then current time is actually the time when it changed,
@@ -58,18 +58,7 @@ class ExperimentController:
         return self.hash_function.run(topology, list(flows), hash_weights, fl)
 
     def _calculate_phi(self, topology: networkx.MultiDiGraph) -> float:
-        number_of_edges = topology.number_of_edges()
-        average_load: float = 0.0
-        for edge in topology.edges(data=True):
-            _, _, edge_data = edge
-            average_load += float(edge_data['current_bandwidth']) / edge_data['bandwidth']
-        average_load /= number_of_edges
-
-        deviation: float = 0.0
-        for edge in topology.edges(data=True):
-            _, _, edge_data = edge
-            deviation += pow(float(edge_data['current_bandwidth']) / edge_data['bandwidth'] - average_load, 2)
-        return deviation / number_of_edges
+        return LinkLoads.from_topology(topology).stats().phi
 
     def generate_subgraphs(self, topology, num_of_subgraphs):
         my_out_edges = topology.edges(nbunch='2', keys=True)
@@ -80,6 +69,8 @@ class ExperimentController:
             if np.fromiter(topology.neighbors(i), int).size != 0:
                 adjacency_list.append(np.fromiter(topology.neighbors(i), int))
         #print("ADJENCY matrix", adjacency_list, len(adjacency_list), type(adjacency_list))
+        # imported here, only experiments split into subgraphs need it
+        import pymetis
         n_cuts, membership = pymetis.part_graph(num_of_subgraphs, adjacency=adjacency_list)
         subgraphs = []
         nodes = []
@@ -87,7 +78,7 @@ class ExperimentController:
         hypergraph = networkx.MultiDiGraph()
         for i in range(num_of_subgraphs):
             hypergraph.add_node(str(i))
-            current_topology: networkx.MultiDiGraph = copy.deepcopy(topology)
+            current_topology: networkx.MultiDiGraph = topology.copy()
             #print(i, np.argwhere(np.array(membership) == i).ravel())
             nodes.append(np.argwhere(np.array(membership) == i).ravel())
             nodes[i] = [str(x) for x in nodes[i]]
@@ -211,6 +202,8 @@ class ExperimentController:
         merged_dict = {}
         num_of_subgraphs = 2
         subgraph_hw = []
+        # iteration times only grow, so active flows are tracked by a sweep instead of searching all flows
+        flow_sweep = self.input_data.flows.sweep()
         for iteration in range(self.num_iterations):
             current_topo, current_time = self._get_current_topology_and_time(current_time)
             #print(current_topo.nodes(), "\n", current_topo.edges()) #data=True
@@ -223,7 +216,7 @@ class ExperimentController:
             print(hypergraph.nodes, hypergraph.edges)
 
             LOG.info(f'current time: {current_time}')
-            current_flows = self.input_data.flows.get(current_time)
+            current_flows = flow_sweep.advance(current_time)
             #print("CURRENT", current_flows)
             flows, flow_paths = self.balance_hypergraph(subgraphs, hypergraph, current_flows, routers)
             #
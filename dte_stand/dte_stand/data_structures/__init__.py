@@ -1,5 +1,8 @@
 from dte_stand.data_structures.topology import Topology
-from dte_stand.data_structures.hash_weights import HashWeights, Bucket
+from dte_stand.data_structures.hash_weights import HashWeights, CompactHashWeights, Bucket
 from dte_stand.data_structures.flows import Flows, Flow
+from dte_stand.data_structures.flow_table import FlowTable, FlowView
 from dte_stand.data_structures.inputs import InputData
+from dte_stand.data_structures.link_loads import LinkLoads, LinkLoadStats
 from dte_stand.data_structures.paths import GraphPathElement
+from dte_stand.data_structures.forwarding import ForwardingTable
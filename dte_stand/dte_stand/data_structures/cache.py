@@ -0,0 +1,228 @@
+import os
+import json
+import hashlib
+import networkx
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+from dte_stand.data_structures.flow_table import FlowTable
+
+import logging
+LOG = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+CACHE_DIR = '.dte_cache'
+MANIFEST = 'manifest.json'
+
+# arrays of FlowTable that are stored in cache
+FLOW_ARRAYS = ('source', 'destination', 'start_time', 'end_time', 'change_offsets',
+               'change_times', 'change_bandwidths', 'flow_ids', 'change_keys')
+
+
+class ExperimentCache:
+    """
+    Binary cache of experiment input files, stored in <inputs folder>/.dte_cache
+
+    Every cached input file has an entry in manifest.json with the file's mtime, size and sha256.
+        Entry is used only if the file did not change since it was cached (hash is calculated only
+        when mtime differs, to tell a touched file from a changed one). Otherwise input file is parsed again
+        and the cache is rewritten.
+    Flows are stored as .npy arrays of FlowTable and loaded memory-mapped,
+        topology as arrays of edge end points, keys and attribute columns.
+    Cache is an optimization only: if it can not be read or written, inputs are parsed as usual
+    """
+    def __init__(self, path_to_folder: str):
+        self._directory = os.path.join(path_to_folder, CACHE_DIR)
+        self._manifest = self._read_manifest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory, name)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._path(MANIFEST), 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {'version': CACHE_VERSION, 'entries': {}}
+        if manifest.get('version') != CACHE_VERSION:
+            LOG.debug(f'Cache version {manifest.get("version")} is outdated, cache will be rebuilt')
+            return {'version': CACHE_VERSION, 'entries': {}}
+        return manifest
+
+    def _write_manifest(self) -> None:
+        temporary = self._path(MANIFEST + '.tmp')
+        with open(temporary, 'w') as f:
+            json.dump(self._manifest, f)
+        os.replace(temporary, self._path(MANIFEST))
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _entry_name(source_path: str) -> str:
+        return os.path.basename(source_path)
+
+    def _valid_entry(self, source_path: str) -> Optional[Dict[str, Any]]:
+        entry = self._manifest['entries'].get(self._entry_name(source_path))
+        if entry is None:
+            return None
+        stat = os.stat(source_path)
+        source = entry['source']
+        if stat.st_size != source['size']:
+            return None
+        if stat.st_mtime_ns != source['mtime_ns']:
+            if self._sha256(source_path) != source['sha256']:
+                return None
+            # file was touched but not changed
+            source['mtime_ns'] = stat.st_mtime_ns
+            try:
+                self._write_manifest()
+            except OSError:
+                pass
+        return entry
+
+    def _store_entry(self, source_path: str, arrays: Dict[str, np.ndarray], data: Dict[str, Any]) -> None:
+        name = self._entry_name(source_path)
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            for array_name, array in arrays.items():
+                temporary = self._path(f'{name}.{array_name}.tmp.npy')
+                np.save(temporary, array)
+                os.replace(temporary, self._path(f'{name}.{array_name}.npy'))
+            stat = os.stat(source_path)
+            self._manifest['entries'][name] = {
+                'source': {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': self._sha256(source_path)},
+                'arrays': list(arrays),
+                'data': data,
+            }
+            self._write_manifest()
+        except OSError as e:
+            LOG.warning(f'Failed to write cache of {source_path}: {e}')
+
+    def _load_arrays(self, source_path: str, entry: Dict[str, Any]) -> Optional[Dict[str, np.ndarray]]:
+        name = self._entry_name(source_path)
+        try:
+            return {array_name: np.load(self._path(f'{name}.{array_name}.npy'), mmap_mode='r')
+                    for array_name in entry['arrays']}
+        except (OSError, ValueError) as e:
+            LOG.warning(f'Failed to read cache of {source_path}: {e}')
+            return None
+
+    def _cached(self, source_path: str, load: Callable[[Dict[str, np.ndarray], Dict[str, Any]], Any],
+                parse: Callable[[], Any], store: Callable[[Any], tuple]) -> Any:
+        entry = self._valid_entry(source_path)
+        if entry is not None:
+            arrays = self._load_arrays(source_path, entry)
+            if arrays is not None:
+                LOG.debug(f'Loaded {source_path} from cache')
+                return load(arrays, entry['data'])
+        result = parse()
+        stored = store(result)
+        if stored is not None:
+            self._store_entry(source_path, *stored)
+        return result
+
+    def flow_table(self, path_to_flows: str, parse: Callable[[], FlowTable]) -> FlowTable:
+        """
+        :param path_to_flows: flow file
+        :param parse: function that reads flow file, called when cache is missing or outdated
+        """
+        def load(arrays, data):
+            return FlowTable(nodes=data['nodes'], validate=False,
+                             **{array_name: arrays[array_name] for array_name in FLOW_ARRAYS})
+
+        def store(table: FlowTable):
+            return {array_name: getattr(table, array_name) for array_name in FLOW_ARRAYS}, {'nodes': table.nodes}
+
+        return self._cached(path_to_flows, load, parse, store)
+
+    def topology(self, path_to_graph: str, parse: Callable[[], networkx.MultiDiGraph]) -> networkx.MultiDiGraph:
+        """
+        :param path_to_graph: topology file
+        :param parse: function that reads topology file, called when cache is missing or outdated
+        """
+        return self._cached(path_to_graph, _topology_from_arrays, parse, _topology_to_arrays)
+
+    def topology_changes(self, path_to_changes: str, parse: Callable[[], Any]) -> Dict[str, Any]:
+        """
+        change timeline sorted by time: {'times': [...], 'changes': {time key: change}}
+
+        :param path_to_changes: topology changes file
+        :param parse: function that returns topology changes as dict {time key: change}, called when cache is missing
+        """
+        def load(arrays, data):
+            return data
+
+        def store(changes: Dict[str, Any]):
+            return {}, changes
+
+        def parse_timeline():
+            changes = parse()
+            return {'times': sorted(int(t) for t in changes), 'changes': changes}
+
+        return self._cached(path_to_changes, load, parse_timeline, store)
+
+
+def _topology_to_arrays(topology: networkx.MultiDiGraph) -> Optional[tuple]:
+    nodes = list(topology.nodes)
+    node_index = {node: index for index, node in enumerate(nodes)}
+    edges = list(topology.edges(keys=True, data=True))
+    try:
+        arrays = {
+            'edge_source': np.array([node_index[u] for u, _, _, _ in edges], dtype=np.int32),
+            'edge_target': np.array([node_index[v] for _, v, _, _ in edges], dtype=np.int32),
+            'edge_key': np.array([key for _, _, key, _ in edges], dtype=np.int64),
+        }
+    except (TypeError, OverflowError):
+        LOG.debug('Topology has edge keys that are not int64, topology is not cached')
+        return None
+    # each edge attribute is stored as a column of one type, with mask of edges that have it.
+    #     Columns of mixed types are not cached: ints would be read back as floats
+    attributes: List[str] = []
+    for attribute in dict.fromkeys(name for _, _, _, edge_data in edges for name in edge_data):
+        values = [edge_data.get(attribute) for _, _, _, edge_data in edges]
+        value_types = {type(value) for value in values if value is not None}
+        try:
+            if value_types <= {int}:
+                column = np.array([value or 0 for value in values], dtype=np.int64)
+            elif value_types <= {float}:
+                column = np.array([value or 0 for value in values], dtype=np.float64)
+            elif value_types <= {str}:
+                column = np.array([value or '' for value in values], dtype=np.str_)
+            else:
+                LOG.debug(f'Edge attribute {attribute} has values of types {value_types}, topology is not cached')
+                return None
+        except OverflowError:
+            LOG.debug(f'Edge attribute {attribute} has values out of int64, topology is not cached')
+            return None
+        arrays[f'edge_attribute_{len(attributes)}'] = column
+        arrays[f'edge_present_{len(attributes)}'] = np.array([value is not None for value in values], dtype=bool)
+        attributes.append(attribute)
+    data = {
+        'graph': topology.graph,
+        'nodes': [[node, node_data] for node, node_data in topology.nodes(data=True)],
+        'edge_attributes': attributes,
+    }
+    try:
+        json.dumps(data)
+    except (TypeError, ValueError):
+        LOG.debug('Topology has attributes that can not be saved to json, topology is not cached')
+        return None
+    return arrays, data
+
+
+def _topology_from_arrays(arrays: Dict[str, np.ndarray], data: Dict[str, Any]) -> networkx.MultiDiGraph:
+    topology = networkx.MultiDiGraph(**data['graph'])
+    topology.add_nodes_from((node, node_data) for node, node_data in data['nodes'])
+    nodes = [node for node, _ in data['nodes']]
+    columns = [(attribute, arrays[f'edge_attribute_{index}'].tolist(), arrays[f'edge_present_{index}'].tolist())
+               for index, attribute in enumerate(data['edge_attributes'])]
+    for edge, (u, v, key) in enumerate(zip(arrays['edge_source'].tolist(), arrays['edge_target'].tolist(),
+                                          arrays['edge_key'].tolist())):
+        topology.add_edge(nodes[u], nodes[v], key=key,
+                          **{attribute: values[edge] for attribute, values, present in columns if present[edge]})
+    return topology
@@ -0,0 +1,82 @@
+import json
+import re
+from typing import Any, Iterator, Optional, TextIO, Tuple
+from dte_stand.data_structures.flow_table import FlowTable
+
+import logging
+LOG = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iter_json_array(file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Decode elements of a json array one by one, reading the file in chunks,
+        so that the whole file and the whole decoded list never have to be in memory
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    # what is expected next: '[' at the start, then element (or ']' for empty array), then ',' or ']'
+    expected = '['
+    end_of_file = False
+
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position < len(buffer):
+            symbol = buffer[position]
+            if expected == '[':
+                if symbol != '[':
+                    raise ValueError(f'Expected json array, got {symbol!r}')
+                expected = 'first element'
+                position += 1
+                continue
+            if expected == 'separator' or (expected == 'first element' and symbol == ']'):
+                if symbol == ']':
+                    return
+                if symbol != ',':
+                    raise ValueError(f'Expected "," or "]" in json array, got {symbol!r}')
+                expected = 'element'
+                position += 1
+                continue
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # element is not fully read yet
+                if end_of_file:
+                    raise
+            else:
+                # element that ends exactly at the end of buffer may be a truncated number
+                if end < len(buffer) or end_of_file:
+                    yield element
+                    expected = 'separator'
+                    position = end
+                    continue
+        elif end_of_file:
+            raise ValueError('Unexpected end of json array')
+
+        chunk = file.read(chunk_size)
+        end_of_file = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def load_flow_table(path_to_flows: str, time_window: Optional[Tuple[int, int]] = None,
+                    chunk_size: int = CHUNK_SIZE) -> FlowTable:
+    """
+    Read flow file into FlowTable without keeping all decoded flows in memory
+
+    :param path_to_flows: json file with a list of flows
+    :param time_window: (start, end) - if given, only flows active at some time in [start, end) are loaded
+    :param chunk_size: how many characters to read from file at once
+    """
+    with open(path_to_flows, 'r') as f:
+        records = iter_json_array(f, chunk_size)
+        if time_window is not None:
+            window_start, window_end = time_window
+            records = (record for record in records
+                       if record['start_time'] < window_end and record['end_time'] > window_start)
+        table = FlowTable.from_records(records)
+    LOG.debug(f'Loaded {len(table)} flows from {path_to_flows}')
+    return table
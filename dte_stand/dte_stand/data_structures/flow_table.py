@@ -0,0 +1,241 @@
+import uuid
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import logging
+LOG = logging.getLogger(__name__)
+
+# fields every flow record must have, flow_id is generated if missing
+REQUIRED_FIELDS = ('start', 'end', 'all_bandwidth', 'start_time', 'end_time')
+
+
+def _integer(value, field: str, flow: str) -> int:
+    """
+    value of an integer field of a flow, integers written as strings are accepted like Flow accepts them
+    """
+    if type(value) is int:
+        return value
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValueError(f'Flow {field} must be an integer, got {value!r}: flow {flow}')
+
+
+class FlowTable:
+    """
+    All flows of the experiment stored as arrays, i-th element of each array describes i-th flow
+
+    nodes - names of all nodes flows start or end at, source and destination are indices in this list
+    start_time, end_time - flow is active in [start_time, end_time)
+    change_offsets - bandwidth changes of i-th flow are change_times[change_offsets[i]:change_offsets[i + 1]]
+        (sorted) and change_bandwidths at the same positions
+    flow_ids - ids of flows as utf-8 bytes
+    Arrays are only read, so they can be memory-mapped
+    """
+    def __init__(self, nodes: List[str], source: np.ndarray, destination: np.ndarray,
+                 start_time: np.ndarray, end_time: np.ndarray, change_offsets: np.ndarray,
+                 change_times: np.ndarray, change_bandwidths: np.ndarray, flow_ids: np.ndarray,
+                 change_keys: Optional[np.ndarray] = None, validate: bool = True):
+        """
+        :param change_keys: change_keys of a table with the same changes, calculated if not given
+        :param validate: check flows like Flow validators do. Not needed for arrays of already checked table
+        """
+        self.nodes = nodes
+        self.source = source
+        self.destination = destination
+        self.start_time = start_time
+        self.end_time = end_time
+        self.change_offsets = change_offsets
+        self.change_times = change_times
+        self.change_bandwidths = change_bandwidths
+        self.flow_ids = flow_ids
+        if validate:
+            self._validate()
+
+        # changes of all flows as one sorted array of keys (flow number, time), to search them for many flows at once
+        self._time_base = int(self.change_times.min()) if len(self.change_times) else 0
+        self._time_span = (int(self.change_times.max()) - self._time_base + 1) if len(self.change_times) else 1
+        self.change_keys: Optional[np.ndarray] = change_keys
+        if change_keys is None and len(self) * self._time_span < 2 ** 62:
+            number_of_changes = np.diff(self.change_offsets)
+            self.change_keys = (np.repeat(np.arange(len(self), dtype=np.int64), number_of_changes) * self._time_span
+                                + (self.change_times - self._time_base))
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> 'FlowTable':
+        """
+        :param records: flows as dicts with the same fields as Flow. flow_id may be missing
+        """
+        node_index: Dict[str, int] = {}
+        source, destination, start_time, end_time, flow_ids = [], [], [], [], []
+        change_offsets, change_times, change_bandwidths = [0], [], []
+        for number, record in enumerate(records):
+            flow_id = record.get('flow_id') or str(uuid.uuid4())
+            missing = [field for field in REQUIRED_FIELDS if field not in record]
+            if missing:
+                raise ValueError(f'Flow fields {missing} are missing: flow {flow_id} (record {number})')
+            source.append(node_index.setdefault(str(record['start']), len(node_index)))
+            destination.append(node_index.setdefault(str(record['end']), len(node_index)))
+            start_time.append(_integer(record['start_time'], 'start_time', flow_id))
+            end_time.append(_integer(record['end_time'], 'end_time', flow_id))
+            flow_ids.append(flow_id)
+            changes = sorted((_integer(t, 'bandwidth change time', flow_id),
+                              _integer(bandwidth, 'bandwidth', flow_id))
+                             for t, bandwidth in record['all_bandwidth'].items())
+            change_times.extend(t for t, _ in changes)
+            change_bandwidths.extend(bandwidth for _, bandwidth in changes)
+            change_offsets.append(len(change_times))
+        return cls(nodes=list(node_index),
+                   source=np.array(source, dtype=np.int32), destination=np.array(destination, dtype=np.int32),
+                   start_time=np.array(start_time, dtype=np.int64), end_time=np.array(end_time, dtype=np.int64),
+                   change_offsets=np.array(change_offsets, dtype=np.int64),
+                   change_times=np.array(change_times, dtype=np.int64),
+                   change_bandwidths=np.array(change_bandwidths, dtype=np.int64),
+                   flow_ids=np.array([flow_id.encode() for flow_id in flow_ids], dtype=np.bytes_))
+
+    @classmethod
+    def from_flows(cls, flows: Iterable) -> 'FlowTable':
+        """
+        :param flows: Flow objects
+        """
+        return cls.from_records({'start': flow.start, 'end': flow.end, 'all_bandwidth': flow.all_bandwidth,
+                                 'start_time': flow.start_time, 'end_time': flow.end_time,
+                                 'flow_id': flow.flow_id} for flow in flows)
+
+    def _validate(self) -> None:
+        # same checks as Flow validators, done for all flows at once
+        checks = [
+            (self.source == self.destination, 'Flow start and end points are same'),
+            (self.end_time <= self.start_time, 'Flow start and end times are incorrect'),
+        ]
+        for failed, message in checks:
+            if failed.any():
+                raise ValueError(f'{message}: flow {self.flow_id(int(np.argmax(failed)))}')
+        if (self.change_bandwidths <= 0).any():
+            flow = int(np.searchsorted(self.change_offsets, np.argmax(self.change_bandwidths <= 0), side='right')) - 1
+            raise ValueError(f'Flow bandwidth must be positive: flow {self.flow_id(flow)}')
+
+    def __len__(self) -> int:
+        return len(self.flow_ids)
+
+    def flow_id(self, flow: int) -> str:
+        return self.flow_ids[flow].decode()
+
+    def all_bandwidth(self, flow: int) -> Dict[str, int]:
+        changes = slice(self.change_offsets[flow], self.change_offsets[flow + 1])
+        return {str(t): int(bandwidth)
+                for t, bandwidth in zip(self.change_times[changes], self.change_bandwidths[changes])}
+
+    def bandwidth_at(self, flows: np.ndarray, current_time: int) -> np.ndarray:
+        """
+        bandwidth of each of flows at current time, 0 if flow has no bandwidth changes at or before current time
+        """
+        flows = np.asarray(flows, dtype=np.int64)
+        if self.change_keys is not None:
+            offset = min(max(current_time - self._time_base, -1), self._time_span - 1)
+            latest = np.searchsorted(self.change_keys, flows * self._time_span + offset, side='right') - 1
+        else:
+            latest = np.array([self.change_offsets[flow] - 1 + np.searchsorted(
+                    self.change_times[self.change_offsets[flow]:self.change_offsets[flow + 1]],
+                    current_time, side='right') for flow in flows], dtype=np.int64)
+        has_bandwidth = latest >= self.change_offsets[flows]
+        return np.where(has_bandwidth, self.change_bandwidths[np.maximum(latest, 0)], 0)
+
+    def view(self, flows: np.ndarray, current_time: int) -> 'FlowView':
+        """
+        flows active at current time with their current bandwidth. Flows with no bandwidth yet are left out
+        """
+        bandwidth = self.bandwidth_at(flows, current_time)
+        has_bandwidth = bandwidth > 0
+        if not has_bandwidth.all():
+            LOG.debug(f'Flows have no bandwidth at {current_time}: '
+                      f'{[self.flow_id(flow) for flow in np.asarray(flows)[~has_bandwidth]]}')
+        return FlowView(self, np.asarray(flows, dtype=np.int64)[has_bandwidth], bandwidth[has_bandwidth])
+
+
+class FlowRecord:
+    """
+    One flow of a FlowView. Has the same attributes as Flow, but reads them from the table when asked
+    """
+    __slots__ = ('_table', '_flow', 'bandwidth')
+
+    def __init__(self, table: FlowTable, flow: int, bandwidth: int):
+        self._table = table
+        self._flow = flow
+        self.bandwidth = bandwidth
+
+    @property
+    def start(self) -> str:
+        return self._table.nodes[self._table.source[self._flow]]
+
+    @property
+    def end(self) -> str:
+        return self._table.nodes[self._table.destination[self._flow]]
+
+    @property
+    def start_time(self) -> int:
+        return int(self._table.start_time[self._flow])
+
+    @property
+    def end_time(self) -> int:
+        return int(self._table.end_time[self._flow])
+
+    @property
+    def flow_id(self) -> str:
+        return self._table.flow_id(self._flow)
+
+    @property
+    def all_bandwidth(self) -> Dict[str, int]:
+        return self._table.all_bandwidth(self._flow)
+
+    def _fields(self) -> tuple:
+        return self.start, self.end, self.all_bandwidth, self.start_time, self.end_time, self.bandwidth, self.flow_id
+
+    def __eq__(self, other) -> bool:
+        try:
+            return self._fields() == (other.start, other.end, other.all_bandwidth, other.start_time,
+                                      other.end_time, other.bandwidth, other.flow_id)
+        except AttributeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return (f'FlowRecord(start={self.start!r}, end={self.end!r}, start_time={self.start_time}, '
+                f'end_time={self.end_time}, bandwidth={self.bandwidth}, flow_id={self.flow_id!r})')
+
+
+class FlowView:
+    """
+    Flows active at some moment of time: numbers of flows in FlowTable and their current bandwidth
+
+    Iterating over the view gives FlowRecord objects, so it can be used instead of a list of Flow
+    """
+    def __init__(self, table: FlowTable, flows: np.ndarray, bandwidth: np.ndarray):
+        self.table = table
+        self.flows = flows
+        self.bandwidth = bandwidth
+
+    def __len__(self) -> int:
+        return len(self.flows)
+
+    def __getitem__(self, item: int) -> FlowRecord:
+        return FlowRecord(self.table, int(self.flows[item]), int(self.bandwidth[item]))
+
+    def __iter__(self) -> Iterator[FlowRecord]:
+        for flow, bandwidth in zip(self.flows.tolist(), self.bandwidth.tolist()):
+            yield FlowRecord(self.table, flow, bandwidth)
+
+    @property
+    def source(self) -> np.ndarray:
+        return self.table.source[self.flows]
+
+    @property
+    def destination(self) -> np.ndarray:
+        return self.table.destination[self.flows]
+
+    @property
+    def flow_ids(self) -> List[str]:
+        return [flow_id.decode() for flow_id in self.table.flow_ids[self.flows]]
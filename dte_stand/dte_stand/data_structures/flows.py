@@ -1,6 +1,12 @@
 import uuid
+import heapq
+import numpy as np
 from pydantic import BaseModel, validator, PositiveInt, Field
-from typing import List, Dict
+from typing import List, Dict, Tuple, Optional
+from dte_stand.data_structures.intervals import IntervalIndex
+from dte_stand.data_structures.flow_table import FlowTable, FlowView
+from dte_stand.data_structures.flow_loader import load_flow_table
+from dte_stand.data_structures.cache import ExperimentCache
 
 import logging
 LOG = logging.getLogger(__name__)
@@ -49,17 +55,58 @@ class InputFlows(BaseModel):
 
 
 class Flows:
-    def __init__(self, path_to_flows):
-        self._flows: InputFlows = InputFlows.parse_file(path_to_flows)
-
-    def get(self, current_time: int) -> List[Flow]:
-        try:
-            needed_flows = (f for f in self._flows if f.start_time <= current_time < f.end_time)
-            result_flows = []
-            for flow in needed_flows:
-                latest_change = [t for t in flow.all_bandwidth if int(t) <= current_time][-1]
-                flow.bandwidth = flow.all_bandwidth[latest_change]
-                result_flows.append(flow)
-            return result_flows
-        except KeyError:
-            return []
+    def __init__(self, path_to_flows, time_window: Optional[Tuple[int, int]] = None,
+                 cache: Optional[ExperimentCache] = None):
+        """
+        :param path_to_flows: json file with a list of flows
+        :param time_window: (start, end) - if given, only flows active at some time in [start, end) are loaded
+        :param cache: if given, all flows are loaded from it (time window is not used) and stored in it
+        """
+        if cache is not None:
+            self.table = cache.flow_table(path_to_flows, lambda: load_flow_table(path_to_flows))
+        else:
+            self.table = load_flow_table(path_to_flows, time_window)
+        self._index = IntervalIndex(self.table.start_time, self.table.end_time)
+
+    def get(self, current_time: int) -> FlowView:
+        """
+        returns flows active at current time, in the order of the flow file, with their current bandwidth
+        """
+        return self.table.view(self._index.query(current_time), current_time)
+
+    def sweep(self) -> 'FlowSweep':
+        """
+        returns iterator over active flows for times that only grow, cheaper than calling get for each time
+        """
+        return FlowSweep(self.table)
+
+
+class FlowSweep:
+    """
+    Sweep line over flow intervals. Each advance returns the same flows as Flows.get for that time,
+        but only flows that started or ended since the previous time are looked at, besides the active ones
+    """
+    def __init__(self, table: FlowTable):
+        self._table = table
+        self._by_start = np.argsort(table.start_time, kind='stable')
+        self._sorted_starts = table.start_time[self._by_start]
+        self._next_start = 0
+        # active flows as heap of (end time, flow number)
+        self._active: List[Tuple[int, int]] = []
+        self._current_time: Optional[int] = None
+
+    def advance(self, current_time: int) -> FlowView:
+        if self._current_time is not None and current_time < self._current_time:
+            raise ValueError(f'Sweep can not go back in time: {current_time} < {self._current_time}')
+        self._current_time = current_time
+
+        started = int(np.searchsorted(self._sorted_starts, current_time, side='right'))
+        new_flows = self._by_start[self._next_start:started]
+        for end_time, flow in zip(self._table.end_time[new_flows].tolist(), new_flows.tolist()):
+            heapq.heappush(self._active, (end_time, flow))
+        self._next_start = started
+        while self._active and self._active[0][0] <= current_time:
+            heapq.heappop(self._active)
+
+        active = np.sort(np.array([flow for _, flow in self._active], dtype=np.int64))
+        return self._table.view(active, current_time)
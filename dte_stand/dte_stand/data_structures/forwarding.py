@@ -0,0 +1,25 @@
+from typing import Dict, List, Optional, Tuple
+from dte_stand.data_structures.paths import GraphPathElement
+
+
+class ForwardingTable:
+    """
+    Class to store candidate nexthops precomputed for every pair of node and destination
+
+    Structure:
+    for each pair of current node and destination node a list of edges (GraphPathElement) is stored.
+        Each edge goes out of current node and is a possible nexthop on the way to destination.
+    Empty list means that destination is not reachable from the node.
+    Pair that is not in the table was not precomputed (for example, the node is not in the topology)
+    """
+    def __init__(self):
+        self.nexthops: Dict[Tuple[str, str], List[GraphPathElement]] = {}
+
+    def put(self, node: str, destination: str, nexthops: List[GraphPathElement]) -> None:
+        self.nexthops[(node, destination)] = nexthops
+
+    def get(self, node: str, destination: str) -> Optional[List[GraphPathElement]]:
+        return self.nexthops.get((node, destination))
+
+    def __len__(self) -> int:
+        return len(self.nexthops)
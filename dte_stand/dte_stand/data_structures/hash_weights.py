@@ -1,8 +1,10 @@
+import copy
+import numpy as np
 from collections import defaultdict
 from typing import Optional
 from dataclasses import dataclass
 from dte_stand.data_structures.paths import GraphPathElement
-from typing import List
+from typing import List, Dict, Tuple, Iterable
 
 @dataclass
 class Bucket:
@@ -61,3 +63,78 @@ class HashWeights:
         buckets are sorted in an arbitrary way, for the sake of consistency
         """
         return sorted(self.weights.get((start_node, end_node), {}).values(), key=sort_buckets)
+
+
+class CompactHashWeights(HashWeights):
+    """
+    Compact hash weights for the case when every edge has the same weight for all destinations
+
+    Structure:
+    weights of all edges are stored in a single numpy vector, index in this vector is the link id of an edge.
+    For each pair of source and destination node an array of candidate link ids is stored.
+        These arrays are shared between all destinations of the same source node
+        and are sorted the same way get_bucket_list sorts buckets.
+    Changing weight of an edge is a single write into the weight vector
+        instead of rebuilding hash weights for all pairs of nodes.
+    """
+    def __init__(self, links: Dict[int, Tuple[str, str, int]], link_weights: Iterable[float]):
+        """
+        :param links: link id -> edge (start_node, neighbor_node, edge_index)
+        :param link_weights: weights of the edges, ordered by link id
+        """
+        self.links = links
+        self.link_index: Dict[Tuple[str, str, int], int] = {edge: link_id for link_id, edge in links.items()}
+        self.weight_vector = np.array(link_weights, dtype=np.float64)
+        self._edges: Dict[int, GraphPathElement] = {
+                link_id: GraphPathElement(from_=start_node, to_=neighbor_node, index=edge_index)
+                for link_id, (start_node, neighbor_node, edge_index) in links.items()}
+
+        node_links: Dict[str, List[int]] = defaultdict(list)
+        for link_id, (start_node, _, _) in links.items():
+            node_links[start_node].append(link_id)
+        all_nodes = {node for start_node, neighbor_node, _ in links.values() for node in (start_node, neighbor_node)}
+        self.candidates: Dict[Tuple[str, str], np.ndarray] = {}
+        for start_node, link_ids in node_links.items():
+            node_candidates = np.array(sorted(link_ids, key=lambda l: self._edges[l].to_), dtype=np.int64)
+            for end_node in all_nodes:
+                if end_node != start_node:
+                    self.candidates[(start_node, end_node)] = node_candidates
+
+    @property
+    def weights(self) -> defaultdict[tuple[str, str], dict[tuple[str, int], Bucket]]:
+        """
+        hash weights in the same structure HashWeights stores them
+        """
+        weights = defaultdict(lambda: {})
+        for (start_node, end_node), link_ids in self.candidates.items():
+            for bucket in self._buckets(link_ids):
+                weights[(start_node, end_node)][(bucket.edge.to_, bucket.edge.index)] = bucket
+        return weights
+
+    def put(self, start_node: str, end_node: str, neighbor_node: str, edge_index: int, weight: int) -> None:
+        # weight of an edge is the same for all destinations, so end_node is not used
+        self.set_link_weight(self.link_index[(start_node, neighbor_node, edge_index)], weight)
+
+    def set_link_weight(self, link_id: int, weight: float) -> None:
+        self.weight_vector[link_id] = weight
+
+    def get_weight(self, start_node: str, end_node: str, neighbor_node: str, edge_index: int) -> Optional[int]:
+        link_id = self.link_index.get((start_node, neighbor_node, edge_index))
+        if link_id is None or (start_node, end_node) not in self.candidates:
+            # no such bucket
+            return None
+        return self.weight_vector[link_id].item()
+
+    def get_bucket_list(self, start_node: str, end_node: str) -> List[Bucket]:
+        return self._buckets(self.candidates.get((start_node, end_node), ()))
+
+    def _buckets(self, link_ids: Iterable[int]) -> List[Bucket]:
+        return [Bucket(edge=self._edges[link_id], weight=self.weight_vector[link_id].item()) for link_id in link_ids]
+
+    def copy(self) -> 'CompactHashWeights':
+        """
+        returns hash weights with a copy of the weight vector. Candidate arrays are shared as they never change
+        """
+        new_weights = copy.copy(self)
+        new_weights.weight_vector = self.weight_vector.copy()
+        return new_weights
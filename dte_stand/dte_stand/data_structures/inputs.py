@@ -1,13 +1,24 @@
 import os
+from typing import Optional, Tuple
 from dte_stand.data_structures.topology import Topology
 from dte_stand.data_structures.flows import Flows
+from dte_stand.data_structures.cache import ExperimentCache
 
 
 class InputData:
-    def __init__(self, path_to_folder):
-        self._flows = Flows(os.path.join(path_to_folder, 'flows0.log'))
+    def __init__(self, path_to_folder, flows_time_window: Optional[Tuple[int, int]] = None, use_cache=True):
+        """
+        :param flows_time_window: (start, end) - if given, only flows active in this time are loaded.
+            Such flows are not cached
+        :param use_cache: keep parsed inputs in binary cache inside the folder, see ExperimentCache
+        """
+        self._cache = ExperimentCache(path_to_folder) if use_cache else None
+        # flows are read on first use, so that startup does not depend on the size of flow file
+        self._flows_path = os.path.join(path_to_folder, 'flows0.log')
+        self._flows_time_window = flows_time_window
+        self._flows: Optional[Flows] = None
         self._topology = Topology(os.path.join(path_to_folder, 'huawei.gml'),
-                                  os.path.join(path_to_folder, 'topology_changes.json'))
+                                  os.path.join(path_to_folder, 'topology_changes.json'), cache=self._cache)
 
     @property
     def topology(self):
@@ -15,4 +26,7 @@ class InputData:
 
     @property
     def flows(self):
+        if self._flows is None:
+            cache = self._cache if self._flows_time_window is None else None
+            self._flows = Flows(self._flows_path, self._flows_time_window, cache=cache)
         return self._flows
@@ -0,0 +1,64 @@
+import numpy as np
+from typing import List, Optional
+
+
+class _IntervalNode:
+    def __init__(self, center: int, by_start: np.ndarray, starts: np.ndarray,
+                 by_end: np.ndarray, ends: np.ndarray):
+        self.center = center
+        # intervals that contain center, sorted by start ascending and by end descending
+        self.by_start = by_start
+        self.starts = starts
+        self.by_end = by_end
+        self.ends = ends
+        self.left: Optional[_IntervalNode] = None
+        self.right: Optional[_IntervalNode] = None
+
+
+class IntervalIndex:
+    """
+    Centered interval tree over half-open intervals [start, end)
+
+    Query returns indices of intervals that contain a point in O(log n + k)
+    """
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self._starts = np.asarray(starts, dtype=np.int64)
+        self._ends = np.asarray(ends, dtype=np.int64)
+        self._root = self._build(np.arange(len(self._starts)))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _build(self, indices: np.ndarray) -> Optional[_IntervalNode]:
+        if not len(indices):
+            return None
+        starts, ends = self._starts[indices], self._ends[indices]
+        center = int(np.median(np.concatenate((starts, ends - 1))))
+        here = (starts <= center) & (center < ends)
+
+        contained = indices[here]
+        by_start = contained[np.argsort(self._starts[contained], kind='stable')]
+        by_end = contained[np.argsort(-self._ends[contained], kind='stable')]
+        node = _IntervalNode(center, by_start, self._starts[by_start], by_end, self._ends[by_end])
+        node.left = self._build(indices[~here & (ends <= center)])
+        node.right = self._build(indices[~here & (starts > center)])
+        return node
+
+    def query(self, point: int) -> np.ndarray:
+        """
+        :return: indices of intervals that contain point, in ascending order
+        """
+        found: List[np.ndarray] = []
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                # all intervals here end after center, so they contain point if they start before it
+                found.append(node.by_start[:np.searchsorted(node.starts, point, side='right')])
+                node = node.left
+            else:
+                # all intervals here start before center, so they contain point if they end after it
+                found.append(node.by_end[:np.searchsorted(-node.ends, -point, side='left')])
+                node = node.right
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(found))
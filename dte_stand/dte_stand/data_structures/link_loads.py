@@ -0,0 +1,71 @@
+import networkx
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+@dataclass
+class LinkLoadStats:
+    """
+    phi - deviation of link utilization from the average utilization (variance of utilization)
+    """
+    phi: float
+    mean_utilization: float
+    std_utilization: float
+    max_utilization: float
+    min_utilization: float
+
+
+class LinkLoads:
+    """
+    Loads and capacities of links as arrays aligned by link id:
+        loads[i] and capacities[i] are current_bandwidth and bandwidth of links[i]
+
+    Loads can be read from topology edges or set directly from a link load array of batch hashing,
+        so statistics of the load are calculated without walking the graph
+    """
+    def __init__(self, links: List[Tuple[str, str, int]], capacities: np.ndarray):
+        if not len(links):
+            raise ValueError('Topology has no links')
+        self.links = links
+        self.capacities = np.asarray(capacities, dtype=np.float64)
+        self.loads = np.zeros(len(links), dtype=np.float64)
+        self._utilization = np.zeros(len(links), dtype=np.float64)
+
+    @classmethod
+    def from_topology(cls, topology: networkx.MultiDiGraph,
+                      links: Optional[List[Tuple[str, str, int]]] = None) -> 'LinkLoads':
+        """
+        :param links: order of links, all edges of topology in their order if not given
+        """
+        if links is None:
+            links = list(topology.edges(keys=True))
+        link_loads = cls(links, [topology.edges[link]['bandwidth'] for link in links])
+        link_loads.read_loads(topology)
+        return link_loads
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def read_loads(self, topology: networkx.MultiDiGraph) -> None:
+        self.loads[:] = [topology.edges[link]['current_bandwidth'] for link in self.links]
+
+    def set_loads(self, loads: np.ndarray) -> None:
+        """
+        :param loads: load of each link in the order of links
+        """
+        np.copyto(self.loads, loads)
+
+    def utilization(self) -> np.ndarray:
+        """
+        load of each link divided by its capacity. Array is reused by the next call, copy it to keep the values
+        """
+        return np.divide(self.loads, self.capacities, out=self._utilization)
+
+    def stats(self) -> LinkLoadStats:
+        utilization = self.utilization()
+        mean = utilization.mean()
+        deviation = utilization - mean
+        phi = float(np.dot(deviation, deviation)) / len(utilization)
+        return LinkLoadStats(phi=phi, mean_utilization=float(mean), std_utilization=float(np.sqrt(phi)),
+                             max_utilization=float(utilization.max()), min_utilization=float(utilization.min()))
@@ -1,8 +1,9 @@
 import networkx
 from typing import Optional
 from pydantic import BaseModel
-import copy
+import bisect
 from typing import List, Tuple, Dict
+from dte_stand.data_structures.cache import ExperimentCache
 
 class MissingElements(BaseModel):
     missing_nodes: List[str]
@@ -23,42 +24,86 @@ class TopologyChanges(BaseModel):
 
 
 class Topology:
-    def __init__(self, path_to_graph: str, path_to_graph_changes: str):
-        with open(path_to_graph, 'rb') as file_graph:
-            self._initial_topology: networkx.MultiDiGraph = networkx.readwrite.read_gml(file_graph)
+    """
+    Topology of the experiment at any moment of time
+
+    Each distinct topology state (initial one and one per change time) is built once, when it is first requested.
+    get returns a read-only view of the state: its nodes and links can not be removed or added.
+        Edge attributes of a view are shared with the stored state, so callers that change them
+        (for example, write current_bandwidth) must ask for a mutable copy.
+    """
+    def __init__(self, path_to_graph: str, path_to_graph_changes: str, cache: Optional[ExperimentCache] = None):
+        """
+        :param cache: if given, topology and changes are loaded from it and stored in it
+        """
+        if cache is None:
+            self._initial_topology: networkx.MultiDiGraph = self._read_graph(path_to_graph)
+            self._topology_changes = TopologyChanges.parse_file(path_to_graph_changes)
+            changed_at = sorted(int(t) for t in self._topology_changes.keys())
+        else:
+            self._initial_topology = cache.topology(path_to_graph, lambda: self._read_graph(path_to_graph))
+            timeline = cache.topology_changes(path_to_graph_changes,
+                                              lambda: self._read_changes(path_to_graph_changes))
+            self._topology_changes = TopologyChanges.parse_obj(timeline['changes'])
+            changed_at = timeline['times']
 
-        self._topology_changes = TopologyChanges.parse_file(path_to_graph_changes)
-        self._changed_at: List[str] = list(self._topology_changes.keys())
-        self._changed_at.sort()
+        # change times as numbers, sorted, and the keys of topology changes they came from
+        self._change_keys: Dict[int, str] = {int(t): t for t in self._topology_changes.keys()}
+        self._changed_at: List[int] = changed_at
+        # topology states that were already built, by change time (None for initial topology)
+        self._snapshots: Dict[Optional[int], networkx.MultiDiGraph] = {None: self._initial_topology}
         # remember the last time get was called. Used for determining the change to topology to apply
         self._previous_time = -1
 
-    def get(self, current_time: int) -> (networkx.MultiDiGraph, Optional[int]):
-        current_topology: networkx.MultiDiGraph = copy.deepcopy(self._initial_topology)
+    @staticmethod
+    def _read_graph(path_to_graph: str) -> networkx.MultiDiGraph:
+        with open(path_to_graph, 'rb') as file_graph:
+            return networkx.readwrite.read_gml(file_graph)
+
+    @staticmethod
+    def _read_changes(path_to_graph_changes: str) -> dict:
+        # checked by the model before it goes to cache
+        changes = TopologyChanges.parse_file(path_to_graph_changes)
+        return {t: changes[t].dict() for t in changes}
 
+    def _latest_change(self, current_time: int) -> Optional[int]:
         # get time of latest change. It is the first point of change between previous time and current time
+        first_after_previous = bisect.bisect_right(self._changed_at, self._previous_time)
+        if first_after_previous < len(self._changed_at) and self._changed_at[first_after_previous] <= current_time:
+            return self._changed_at[first_after_previous]
+        # no changes in topology between previous and current
+        # so take the last change before previous time
+        if first_after_previous > 0:
+            return self._changed_at[first_after_previous - 1]
+        # no changes at all
+        return None
+
+    def _snapshot(self, change_time: Optional[int]) -> networkx.MultiDiGraph:
         try:
-            latest_change = [t for t in self._changed_at
-                             if self._previous_time < int(t) <= current_time][0]
-        except IndexError:
-            # no changes in topology between previous and current
-            # so take the last change before previous time
-            try:
-                latest_change = [t for t in self._changed_at if int(t) <= self._previous_time][-1]
-            except IndexError:
-                # no changes at all
-                return current_topology, None
-        self._previous_time = int(latest_change)
-
-        # apply change
-        try:
-            current_changes = self._topology_changes[str(latest_change)]
+            return self._snapshots[change_time]
         except KeyError:
-            # no changes in topology at given time slot
-            return current_topology, None
+            pass
 
+        snapshot = self._initial_topology.copy()
+        current_changes = self._topology_changes[self._change_keys[change_time]]
         for node_id in current_changes.missing_nodes:
-            current_topology.remove_node(node_id)
+            snapshot.remove_node(node_id)
         for node1_id, node2_id, index in current_changes.missing_links:
-            current_topology.remove_edge(node1_id, node2_id, index)
-        return current_topology, int(latest_change)
+            snapshot.remove_edge(node1_id, node2_id, index)
+        self._snapshots[change_time] = snapshot
+        return snapshot
+
+    def get(self, current_time: int, mutable: bool = False) -> (networkx.MultiDiGraph, Optional[int]):
+        """
+        :param current_time: experiment time in milliseconds
+        :param mutable: if True, a copy of topology is returned that can be changed freely.
+            Otherwise a read-only view shared with other calls for the same topology state is returned
+        :return: topology and time of the change it has (None if topology has no changes)
+        """
+        latest_change = self._latest_change(current_time)
+        if latest_change is not None:
+            self._previous_time = latest_change
+
+        snapshot = self._snapshot(latest_change)
+        current_topology = snapshot.copy() if mutable else snapshot.copy(as_view=True)
+        return current_topology, latest_change
@@ -1,2 +1,16 @@
-from dte_stand.hash_function.dummy import DummyHashFunction
-from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from typing import TYPE_CHECKING
+
+from dte_stand.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from dte_stand.hash_function.dummy import DummyHashFunction
+    from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+
+# hash functions are imported when the configuration asks for one of them
+_HASH_FUNCTIONS = {
+    'DummyHashFunction': 'dte_stand.hash_function.dummy',
+    'WeightedDxHashFunction': 'dte_stand.hash_function.dxhash',
+}
+__all__ = list(_HASH_FUNCTIONS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _HASH_FUNCTIONS)
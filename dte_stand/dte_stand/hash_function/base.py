@@ -1,10 +1,12 @@
 import abc
 import networkx
+import numpy as np
 from networkx.exception import NodeNotFound, NetworkXNoPath
-from typing import Generator, Optional, Any, List
+from typing import Generator, Optional, Any, List, Union
 from dte_stand.data_structures import HashWeights, Flow
 from dte_stand.paths.base import BasePathCalculator
 from dte_stand.data_structures import GraphPathElement, Bucket
+from dte_stand.hash_function.batch import BatchRouting, FlowBatch, BatchResult
 
 
 import logging
@@ -27,6 +29,15 @@ class BaseHashFunction(metaclass=abc.ABCMeta):
     def _choose_nexthop(self, buckets: List[Bucket], flow_id: str) -> Optional[GraphPathElement]:
         ...
 
+    def _choose_nexthop_batch(self, flow_hashes: np.ndarray, node_keys: np.ndarray, first: np.ndarray,
+                              count: np.ndarray, weights: np.ndarray, max_weights: np.ndarray,
+                              max_positions: np.ndarray) -> np.ndarray:
+        raise NotImplementedError(f'{type(self).__name__} does not support batch hashing')
+
+    @property
+    def supports_batch(self) -> bool:
+        return type(self)._choose_nexthop_batch is not BaseHashFunction._choose_nexthop_batch
+
     def _flow_path(self, topology: networkx.MultiDiGraph,
                    flow: Flow, hash_weights: HashWeights, current_node,
                    depth: Optional[int] = None) -> List[GraphPathElement]:
@@ -35,20 +46,17 @@ class BaseHashFunction(metaclass=abc.ABCMeta):
         #print(topology.nodes(data=False))
         #print(hash_weights.weights)
         try:
-            all_paths = self.path_calculator.calculate(topology, current_node, flow.end)
+            nexthops = self.path_calculator.get_nexthops(topology, current_node, flow.end)
         except NetworkXNoPath as e:
             raise PathNotFoundError(current_node, flow) from e
+        except IndexError:
+            raise PathNotFoundError(current_node, flow)
         '''
         except NodeNotFound:
             LOG.info(f'One of the nodes ({current_node} or {flow.end}) was removed from topology.'
                      f'Flow ({flow}) is dropped')
             raise
         '''
-        #print("PATHS", all_paths)
-        try:
-            nexthops = [path[0] for path in all_paths]
-        except IndexError:
-            raise PathNotFoundError(current_node, flow)
 
         # there might be a case when no bucket exists for a nexthop
         # it happens because hash weights come from previous iteration
@@ -122,3 +130,169 @@ class BaseHashFunction(metaclass=abc.ABCMeta):
                 #print(topology.edges[element.from_, element.to_, element.index]['current_bandwidth'])
                 topology.edges[element.from_, element.to_, element.index]['current_bandwidth'] += flow.bandwidth
         return flow_paths
+
+    def run_batch(self, topology: networkx.MultiDiGraph, flows: Union[FlowBatch, List[Flow]],
+                  hash_weights: HashWeights, routing: Optional[BatchRouting] = None,
+                  depth: Optional[int] = None, update_topology: bool = True) -> BatchResult:
+        """
+        Same as run, but all flows are hashed together hop by hop using arrays.
+            Chosen paths are the same as run chooses
+
+        :param topology: current topology
+        :param flows: current flows, either as a list or already converted by routing.flow_batch
+        :param hash_weights: current hash weights
+        :param routing: arrays compiled from path calculator for this topology.
+            Pass it to avoid compiling it on every call
+        :param depth: same as in run
+        :param update_topology: write link loads to current_bandwidth of topology edges.
+            Not needed when the caller reads link loads from the result
+        :return: link loads and paths of all flows
+        """
+        if routing is None:
+            routing = BatchRouting(topology, self.path_calculator)
+        if not isinstance(flows, FlowBatch):
+            flows = routing.flow_batch(flows)
+
+        weights = routing.candidate_weights(hash_weights, self._default_weight)
+        # path that is not simple cannot be longer than the number of links, without it flows could loop forever
+        max_hops = len(routing.links) if depth is None else max(depth, 0)
+        flow_idx = np.arange(len(flows))
+        paths, routed = self._route_batch(routing, flows, flow_idx, flows.source,
+                                          np.full(len(flows), max_hops, dtype=np.int64),
+                                          weights, *routing.row_maximums(weights), stop_looping=depth is None)
+        self._log_failed(flows, flow_idx[~routed])
+
+        link_loads = np.zeros(len(routing.links), dtype=np.float64)
+        path_flows, path_hops = np.nonzero(paths >= 0)
+        np.add.at(link_loads, paths[path_flows, path_hops], flows.bandwidth[path_flows])
+
+        if update_topology:
+            for _, _, edge_data in topology.edges(data=True):
+                edge_data['current_bandwidth'] = 0
+            for link_id, (edge_start, edge_end, edge_index) in enumerate(routing.links):
+                topology.edges[edge_start, edge_end, edge_index]['current_bandwidth'] = link_loads[link_id].item()
+        return BatchResult(link_loads=link_loads, paths=paths, routed=routed)
+
+    def reroute_batch(self, topology: networkx.MultiDiGraph, flows: FlowBatch, hash_weights: HashWeights,
+                      changed_node: str, previous: BatchResult, routing: BatchRouting,
+                      update_topology: bool = True) -> BatchResult:
+        """
+        Update result of run_batch after hash weights of one node have changed.
+
+        Only flows that go through changed node are hashed again, starting from that node,
+            the part of their path before it stays the same. Flows that were not routed are hashed from source.
+            Loads are updated by deltas and current_bandwidth is written only for links whose load changed.
+        Result is the same as run_batch with full paths (depth=None) would return.
+
+        :param topology: current topology
+        :param flows: same flows that previous result was calculated for
+        :param hash_weights: current hash weights
+        :param changed_node: node whose bucket weights have changed since previous result
+        :param previous: result of run_batch or reroute_batch for these flows and topology
+        :param routing: same routing that previous result was calculated with
+        :param update_topology: same as in run_batch
+        :return: link loads and paths of all flows
+        """
+        node = routing.node_index.get(changed_node)
+        paths = previous.paths
+        on_path = paths >= 0
+        if node is None:
+            visits = np.zeros_like(on_path)
+        else:
+            visits = on_path & (routing.link_from[np.where(on_path, paths, 0)] == node)
+        passing = visits.any(axis=1)
+        # flows with unknown source or destination can not be routed with any weights
+        known = (flows.source >= 0) & (flows.destination >= 0)
+        flow_idx = np.flatnonzero(passing | (~previous.routed & known))
+        if not len(flow_idx):
+            return previous
+        # hop at which flow leaves changed node, everything before it is kept
+        keep_hops = np.where(passing[flow_idx], visits[flow_idx].argmax(axis=1), 0)
+        start = np.where(passing[flow_idx], -1 if node is None else node, flows.source[flow_idx])
+
+        weights = routing.candidate_weights(hash_weights, self._default_weight)
+        suffix, suffix_routed = self._route_batch(routing, flows, flow_idx, start,
+                                                  len(routing.links) - keep_hops,
+                                                  weights, *routing.row_maximums(weights), stop_looping=True)
+
+        old_paths = paths[flow_idx]
+        old_hops = np.arange(old_paths.shape[1])
+        # flows that fail now are removed from all links of their old path
+        removed = (old_paths >= 0) & ((old_hops >= keep_hops[:, None]) | ~suffix_routed[:, None])
+        width = max(paths.shape[1], int((keep_hops + suffix.shape[1]).max(initial=0)))
+        new_rows = np.full((len(flow_idx), width), -1, dtype=np.int64)
+        new_rows[:, :old_paths.shape[1]] = old_paths
+        new_rows[np.arange(width) >= keep_hops[:, None]] = -1
+        suffix_flows, suffix_hops = np.nonzero(suffix >= 0)
+        new_rows[suffix_flows, keep_hops[suffix_flows] + suffix_hops] = suffix[suffix_flows, suffix_hops]
+        new_rows[~suffix_routed] = -1
+
+        delta = np.zeros(len(routing.links), dtype=np.float64)
+        removed_flows, removed_hops = np.nonzero(removed)
+        np.subtract.at(delta, old_paths[removed_flows, removed_hops], flows.bandwidth[flow_idx[removed_flows]])
+        np.add.at(delta, suffix[suffix_flows, suffix_hops], flows.bandwidth[flow_idx[suffix_flows]])
+
+        new_paths = np.full((len(flows), width), -1, dtype=np.int64)
+        new_paths[:, :paths.shape[1]] = paths
+        new_paths[flow_idx] = new_rows
+        routed = previous.routed.copy()
+        routed[flow_idx] = suffix_routed
+        self._log_failed(flows, flow_idx[~suffix_routed & previous.routed[flow_idx]])
+
+        link_loads = previous.link_loads + delta
+        if update_topology:
+            for link_id in np.flatnonzero(delta):
+                edge_start, edge_end, edge_index = routing.links[link_id]
+                topology.edges[edge_start, edge_end, edge_index]['current_bandwidth'] = link_loads[link_id].item()
+        return BatchResult(link_loads=link_loads, paths=new_paths, routed=routed)
+
+    def _route_batch(self, routing: BatchRouting, flows: FlowBatch, flow_idx: np.ndarray, start: np.ndarray,
+                     max_hops: np.ndarray, weights: np.ndarray, row_max: np.ndarray, row_argmax: np.ndarray,
+                     stop_looping: bool = True):
+        """
+        hashes flows with indices flow_idx from start nodes hop by hop
+
+        :param max_hops: max number of hops of each flow
+        :param stop_looping: if True, flows that did not reach destination in max_hops are not routed
+        :return: paths of flows (one row per flow in flow_idx, link ids padded with -1)
+            and mask of routed flows. Paths of flows that are not routed are all -1
+        """
+        current = np.array(start, dtype=np.int64)
+        destination = flows.destination[flow_idx]
+        flow_hash = flows.flow_hash[flow_idx]
+        routed = (current >= 0) & (destination >= 0)
+        active = routed & (current != destination) & (max_hops > 0)
+        path_columns = []
+        for hop in range(int(max_hops.max(initial=0))):
+            active &= hop < max_hops
+            pending = np.flatnonzero(active)
+            if not len(pending):
+                break
+            rows = routing.row(current[pending], destination[pending])
+            first = routing.offsets[rows]
+            chosen = self._choose_nexthop_batch(flow_hash[pending], routing.node_keys[current[pending]], first,
+                                                routing.offsets[rows + 1] - first, weights,
+                                                row_max[rows], row_argmax[rows])
+            not_found = chosen < 0
+            routed[pending[not_found]] = False
+            active[pending[not_found]] = False
+
+            pending, chosen = pending[~not_found], chosen[~not_found]
+            column = np.full(len(flow_idx), -1, dtype=np.int64)
+            column[pending] = routing.candidate_links[chosen]
+            path_columns.append(column)
+            current[pending] = routing.link_to[column[pending]]
+            active[pending] = current[pending] != destination[pending]
+        if stop_looping:
+            # flows that did not reach destination are looping
+            routed &= current == destination
+
+        paths = (np.stack(path_columns, axis=1) if path_columns
+                 else np.full((len(flow_idx), 0), -1, dtype=np.int64))
+        paths[~routed] = -1
+        return paths, routed
+
+    @staticmethod
+    def _log_failed(flows: FlowBatch, failed: np.ndarray) -> None:
+        if len(failed):
+            LOG.error(f'Failed to find path for flows: {[flows.flow_ids[i] for i in failed]}')
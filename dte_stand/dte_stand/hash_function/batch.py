@@ -0,0 +1,158 @@
+import networkx
+import numpy as np
+from networkx.exception import NodeNotFound, NetworkXNoPath
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Iterable
+from dte_stand.data_structures import HashWeights, CompactHashWeights, Flow, FlowView
+from dte_stand.paths.base import BasePathCalculator
+from dte_stand.hash_function.stateless_hash import string_key
+
+import logging
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class FlowBatch:
+    """
+    Flows stored as arrays, so that all of them can be hashed together
+    i-th element of each array describes i-th flow
+    source, destination - node indices in BatchRouting.nodes (-1 if node is not in topology)
+    flow_hash - 64-bit key of flow id
+    bandwidth - current bandwidth of flow
+    """
+    flow_ids: List[str]
+    source: np.ndarray
+    destination: np.ndarray
+    flow_hash: np.ndarray
+    bandwidth: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.flow_ids)
+
+
+@dataclass
+class BatchResult:
+    """
+    Result of hashing a FlowBatch
+    link_loads - bandwidth going through each link, indexed by link id
+    paths - link ids of each flow's path, one row per flow, padded with -1
+    routed - False for flows whose path was not found. They are not counted in link_loads
+    """
+    link_loads: np.ndarray
+    paths: np.ndarray
+    routed: np.ndarray
+
+
+class BatchRouting:
+    """
+    Forwarding table of a topology compiled into arrays
+
+    Nodes and links are numbered. Candidate nexthops of all pairs of (node, destination) are stored
+        in one array of link ids (candidate_links), row of the pair (node * number_of_nodes + destination)
+        occupies candidate_links[offsets[row]:offsets[row + 1]].
+    Candidates are in the same order as path calculator returns nexthops,
+        so batch hashing chooses the same nexthops as hashing flows one by one.
+    """
+    def __init__(self, topology: networkx.MultiDiGraph, path_calculator: BasePathCalculator,
+                 links: Optional[List[Tuple[str, str, int]]] = None):
+        """
+        :param topology: topology to route flows in
+        :param path_calculator: path calculator prepared for this topology
+        :param links: edges of the topology ordered by link id. If None, order of topology.edges is used
+        """
+        self.nodes: List[str] = list(topology.nodes)
+        self.node_index: Dict[str, int] = {node: index for index, node in enumerate(self.nodes)}
+        self.node_keys = np.array([string_key(node) for node in self.nodes], dtype=np.uint64)
+        self.links: List[Tuple[str, str, int]] = (list(links) if links is not None
+                                                  else list(topology.edges(keys=True)))
+        self.link_index: Dict[Tuple[str, str, int], int] = {link: index for index, link in enumerate(self.links)}
+        self.link_from = np.array([self.node_index[link[0]] for link in self.links], dtype=np.int64)
+        self.link_to = np.array([self.node_index[link[1]] for link in self.links], dtype=np.int64)
+
+        number_of_nodes = len(self.nodes)
+        self.offsets = np.zeros(number_of_nodes * number_of_nodes + 1, dtype=np.int64)
+        candidate_links = []
+        for node_idx, node in enumerate(self.nodes):
+            for destination_idx, destination in enumerate(self.nodes):
+                row = node_idx * number_of_nodes + destination_idx
+                if node != destination:
+                    try:
+                        nexthops = path_calculator.get_nexthops(topology, node, destination)
+                    except (NetworkXNoPath, NodeNotFound, IndexError):
+                        nexthops = []
+                    candidate_links.extend(self.link_index[(nexthop.from_, nexthop.to_, nexthop.index)]
+                                           for nexthop in nexthops)
+                self.offsets[row + 1] = len(candidate_links)
+        self.candidate_links = np.array(candidate_links, dtype=np.int64)
+        self.candidate_rows = np.repeat(np.arange(number_of_nodes * number_of_nodes), np.diff(self.offsets))
+
+        # mapping from candidates to link ids of compact hash weights, filled on first use
+        self._compact_link_index: Optional[Dict[Tuple[str, str, int], int]] = None
+        self._compact_candidates: Optional[np.ndarray] = None
+
+    def row(self, node: np.ndarray, destination: np.ndarray) -> np.ndarray:
+        return node * len(self.nodes) + destination
+
+    def flow_batch(self, flows: Iterable[Flow]) -> FlowBatch:
+        if isinstance(flows, FlowView):
+            # columns of the flow table are used directly, node numbers of the table are mapped to ours
+            table_nodes = np.array([self.node_index.get(node, -1) for node in flows.table.nodes], dtype=np.int64)
+            flow_ids = flows.flow_ids
+            return FlowBatch(
+                    flow_ids=flow_ids,
+                    source=table_nodes[flows.source],
+                    destination=table_nodes[flows.destination],
+                    flow_hash=np.array([string_key(flow_id) for flow_id in flow_ids], dtype=np.uint64),
+                    bandwidth=flows.bandwidth.astype(np.float64)
+            )
+
+        flows = list(flows)
+        return FlowBatch(
+                flow_ids=[flow.flow_id for flow in flows],
+                source=np.array([self.node_index.get(flow.start, -1) for flow in flows], dtype=np.int64),
+                destination=np.array([self.node_index.get(flow.end, -1) for flow in flows], dtype=np.int64),
+                flow_hash=np.array([string_key(flow.flow_id) for flow in flows], dtype=np.uint64),
+                bandwidth=np.array([flow.bandwidth for flow in flows], dtype=np.float64)
+        )
+
+    def candidate_weights(self, hash_weights: HashWeights, default_weight: float) -> np.ndarray:
+        """
+        returns hash weight of every candidate nexthop, aligned with candidate_links
+        candidates that have no bucket in hash weights get default weight
+        """
+        if isinstance(hash_weights, CompactHashWeights):
+            if self._compact_link_index is not hash_weights.link_index:
+                self._compact_link_index = hash_weights.link_index
+                self._compact_candidates = np.array(
+                        [hash_weights.link_index.get(self.links[link_id], -1) for link_id in self.candidate_links],
+                        dtype=np.int64)
+            missing = self._compact_candidates < 0
+            weights = hash_weights.weight_vector[np.where(missing, 0, self._compact_candidates)]
+            weights[missing] = default_weight
+            return weights
+
+        number_of_nodes = len(self.nodes)
+        weights = np.empty(len(self.candidate_links), dtype=np.float64)
+        for entry, (row, link_id) in enumerate(zip(self.candidate_rows, self.candidate_links)):
+            start_node, neighbor_node, edge_index = self.links[link_id]
+            weight = hash_weights.get_weight(start_node, self.nodes[row % number_of_nodes],
+                                             neighbor_node, edge_index)
+            weights[entry] = default_weight if weight is None else weight
+        return weights
+
+    def row_maximums(self, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        returns max candidate weight of each row (-inf for empty rows)
+            and the position of the first candidate with this weight (-1 for empty rows)
+        """
+        number_of_rows = len(self.offsets) - 1
+        row_max = np.full(number_of_rows, -np.inf)
+        row_argmax = np.full(number_of_rows, -1, dtype=np.int64)
+        if not len(weights):
+            return row_max, row_argmax
+        non_empty = np.flatnonzero(np.diff(self.offsets))
+        row_max[non_empty] = np.maximum.reduceat(weights, self.offsets[non_empty])
+        is_max = np.flatnonzero(weights == row_max[self.candidate_rows])
+        max_rows, first = np.unique(self.candidate_rows[is_max], return_index=True)
+        row_argmax[max_rows] = is_max[first]
+        return row_max, row_argmax
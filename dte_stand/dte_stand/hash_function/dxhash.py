@@ -63,41 +63,78 @@ class WeightedDxHashFunction(BaseHashFunction):
 '''
 
 from typing import Optional, List, Tuple
+import numpy as np
 from dte_stand.data_structures import Bucket, GraphPathElement
 from dte_stand.hash_function.base import BaseHashFunction
-import random
-import copy
+from dte_stand.hash_function.stateless_hash import MASK_64, mix64, string_key, unit_interval, \
+    mix64_array, unit_interval_array
 
 import logging
 LOG = logging.getLogger(__name__)
 
 
 class WeightedDxHashFunction(BaseHashFunction):
-    def __init__(self, *args, **kwargs):
+    """
+    Weighted DxHash: probe pseudo-random buckets until the probed bucket accepts the flow.
+        Bucket accepts the flow with probability equal to its weight divided by the max weight of all buckets,
+        buckets with non-positive weights never accept.
+
+    Probe sequence is a stateless hash of (seed, flow id, node, probe number),
+        so the same flow always takes the same nexthop for the same weights, in any process
+    """
+    def __init__(self, *args, seed: int = 0, max_probes: int = 64, **kwargs):
+        self.seed = seed
+        self.max_probes = max_probes
         return super().__init__(*args, **kwargs)
 
     def get_weight(self, bucket):
         return bucket.weight
 
+    def _probe_start(self, flow_id: str, node: str) -> int:
+        return mix64(string_key(flow_id) ^ mix64(string_key(node) ^ self.seed))
+
     def _choose_nexthop(self, buckets: List[Bucket], flow_id: str) -> Optional[GraphPathElement]:
         if buckets:
             max_weight = max(buckets, key=self.get_weight).weight
             if max_weight <= 0:
                 return None
-            buckets_averaged = copy.deepcopy(buckets)
-            for i in buckets_averaged:
-                i.weight /= max_weight
-            random.seed(flow_id, version=2)
-            while buckets_averaged:
-                key = random.randint(0, 10000)
-                bucket_number = key % len(buckets_averaged)
-                bucket_weight = self.get_weight(buckets_averaged[bucket_number])
-                if bucket_weight:
-                    random.seed()
-                    hash_weight = random.random()
-                    if hash_weight < bucket_weight:
-                        #LOG.debug(f'nexthop: {buckets_averaged[bucket_number]}')
-                        #LOG.info(f'nexthop: {buckets_averaged[bucket_number].edge,buckets_averaged[bucket_number].weight}')
-                        return buckets_averaged[bucket_number].edge
-                del buckets_averaged[bucket_number]
+            probe_start = self._probe_start(flow_id, buckets[0].edge.from_)
+            for probe in range(self.max_probes):
+                hash_value = mix64((probe_start + probe) & MASK_64)
+                bucket = buckets[hash_value % len(buckets)]
+                if bucket.weight > 0 and unit_interval(hash_value) * max_weight < bucket.weight:
+                    return bucket.edge
+            # bucket with max weight always accepts the flow, so we get here only if it was never probed
+            return max(buckets, key=self.get_weight).edge
         return None
+
+    def _choose_nexthop_batch(self, flow_hashes: np.ndarray, node_keys: np.ndarray, first: np.ndarray,
+                              count: np.ndarray, weights: np.ndarray, max_weights: np.ndarray,
+                              max_positions: np.ndarray) -> np.ndarray:
+        """
+        Same as _choose_nexthop, but for many flows at once. Probes of all flows are done together
+
+        :param flow_hashes: string_key of each flow's id
+        :param node_keys: string_key of each flow's current node
+        :param first: position of each flow's first candidate in weights
+        :param count: number of candidates of each flow
+        :param weights: weights of all candidates
+        :param max_weights: max weight of each flow's candidates
+        :param max_positions: position of the first candidate with max weight, for each flow
+        :return: position of chosen candidate in weights for each flow, -1 if no nexthop can be chosen
+        """
+        chosen = np.full(len(flow_hashes), -1, dtype=np.int64)
+        probe_start = mix64_array(flow_hashes ^ mix64_array(node_keys ^ np.uint64(self.seed & MASK_64)))
+        pending = np.flatnonzero((count > 0) & (max_weights > 0))
+        for probe in range(self.max_probes):
+            if not len(pending):
+                break
+            hash_values = mix64_array(probe_start[pending] + np.uint64(probe))
+            positions = first[pending] + (hash_values % count[pending].astype(np.uint64)).astype(np.int64)
+            probed_weights = weights[positions]
+            accepted = (probed_weights > 0) & \
+                       (unit_interval_array(hash_values) * max_weights[pending] < probed_weights)
+            chosen[pending[accepted]] = positions[accepted]
+            pending = pending[~accepted]
+        chosen[pending] = max_positions[pending]
+        return chosen
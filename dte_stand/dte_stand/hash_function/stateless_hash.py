@@ -0,0 +1,48 @@
+import hashlib
+import numpy as np
+from functools import lru_cache
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+
+def mix64(value: int) -> int:
+    """
+    Stateless 64-bit integer hash (splitmix64 finalizer)
+    """
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+@lru_cache(maxsize=None)
+def string_key(value: str) -> int:
+    """
+    64-bit key of a string (flow id or node name)
+    Unlike python's hash() it is the same in every process
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'little')
+
+
+def unit_interval(hash_value: int) -> float:
+    """
+    Convert hash value into a float in [0, 1)
+    """
+    return (mix64(hash_value) >> 11) * 2.0 ** -53
+
+
+def mix64_array(values: np.ndarray) -> np.ndarray:
+    """
+    mix64 applied to each element of uint64 array. Overflow wraps around like in mix64
+    """
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def unit_interval_array(hash_values: np.ndarray) -> np.ndarray:
+    """
+    unit_interval applied to each element of uint64 array
+    """
+    return (mix64_array(hash_values) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
@@ -0,0 +1,25 @@
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(module_name: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    Module __getattr__ and __dir__ for a package, that imports its classes on first use
+
+    :param module_name: name of the package, __name__ of its __init__
+    :param exports: name of each class exported by the package and the module it is defined in
+    :return: __getattr__ and __dir__ to assign in the package
+    """
+    def __getattr__(name: str):
+        if name not in exports:
+            raise AttributeError(f'module {module_name!r} has no attribute {name!r}')
+        value = getattr(importlib.import_module(exports[name]), name)
+        # next access finds the class in the package, without calling __getattr__
+        setattr(sys.modules[module_name], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[module_name])) | set(exports))
+
+    return __getattr__, __dir__
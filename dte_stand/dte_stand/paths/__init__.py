@@ -1,2 +1,16 @@
-from dte_stand.paths.dummy import DummyPathCalculator
-from dte_stand.paths.dag_calculator import DAGCalculator
+from typing import TYPE_CHECKING
+
+from dte_stand.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from dte_stand.paths.dummy import DummyPathCalculator
+    from dte_stand.paths.dag_calculator import DAGCalculator
+
+# path calculators are imported when they are first asked for
+_PATH_CALCULATORS = {
+    'DummyPathCalculator': 'dte_stand.paths.dummy',
+    'DAGCalculator': 'dte_stand.paths.dag_calculator',
+}
+__all__ = list(_PATH_CALCULATORS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _PATH_CALCULATORS)
@@ -1,13 +1,48 @@
 import abc
 import networkx
 from typing import Optional
-from dte_stand.data_structures import GraphPathElement
+from dte_stand.data_structures import GraphPathElement, ForwardingTable
 from typing import List
 
 
 class BasePathCalculator:
+    def __init__(self):
+        self.forwarding_table = ForwardingTable()
+
     def prepare_iteration(self, topology: networkx.MultiDiGraph) -> None:
-        ...
+        self.forwarding_table = self._build_forwarding_table(topology)
+
+    def _build_forwarding_table(self, topology: networkx.MultiDiGraph) -> ForwardingTable:
+        """
+        calculate nexthops for every pair of nodes in topology once,
+            so that hash function does not need to run path calculation for every hop of every flow
+        """
+        forwarding_table = ForwardingTable()
+        topo_nodes = list(topology.nodes)
+        for node in topo_nodes:
+            for destination in topo_nodes:
+                if node == destination:
+                    continue
+                try:
+                    nexthops = [path[0] for path in self.calculate(topology, node, destination)]
+                except (networkx.NetworkXNoPath, IndexError):
+                    nexthops = []
+                except networkx.NodeNotFound:
+                    continue
+                forwarding_table.put(node, destination, nexthops)
+        return forwarding_table
+
+    def get_nexthops(self, topology: networkx.MultiDiGraph, source: str, destination: str) -> List[GraphPathElement]:
+        """
+        returns possible nexthops from source to destination
+
+        nexthops are taken from forwarding table built in prepare_iteration.
+        If the pair was not precomputed, paths are calculated as usual
+        """
+        nexthops = self.forwarding_table.get(source, destination)
+        if nexthops is None:
+            nexthops = [path[0] for path in self.calculate(topology, source, destination)]
+        return nexthops
 
     @abc.abstractmethod
     def calculate(self, topology: networkx.MultiDiGraph, source: str,
@@ -1,22 +1,60 @@
 import networkx
 import math
+import numpy as np
+from collections import OrderedDict
 from networkx.algorithms.shortest_paths import shortest_path_length
 import networkx.algorithms.simple_paths
 from networkx.algorithms.traversal import dfs_tree, bfs_edges, dfs_edges
 from networkx.algorithms.dag import dag_longest_path, topological_sort
-from typing import Generator, Tuple, List
+from typing import Generator, Tuple, List, Hashable, Dict, Optional
 
 from dte_stand.paths.base import BasePathCalculator
 from dte_stand.data_structures import GraphPathElement
 
 
 class DAGCalculator(BasePathCalculator):
-    def __init__(self, length_cutoff_fraction=2.0):
+    # everything prepare_iteration calculates for a topology, these are stored in cache
+    _prepared_attributes = ('_forward_ordering', '_reverse_ordering', '_node_index',
+                            '_forward_distances', '_reverse_distances',
+                            '_forward_one_change', '_reverse_one_change', 'forwarding_table')
+
+    # source node for dfs numbering is chosen by one of these methods
+    _source_selections = {
+        'longest_path': '_node_with_longest_path',
+        'double_sweep': '_double_sweep_node',
+        'pseudo_peripheral': '_pseudo_peripheral_node',
+    }
+
+    def __init__(self, length_cutoff_fraction=2.0, cache_size=16, source_selection='longest_path'):
+        """
+        :param cache_size: how many topologies to keep prepared orderings for.
+            Orderings are reused when prepare_iteration gets a topology with the same nodes and edges.
+            0 disables the cache
+        :param source_selection: how to choose source node of dfs numbering:
+            'longest_path' - node with the longest dfs path, quadratic in graph size;
+            'double_sweep' - end of the second of two bfs sweeps, linear;
+            'pseudo_peripheral' - George-Liu pseudo-peripheral node search, a few bfs sweeps
+        """
+        if source_selection not in self._source_selections:
+            raise ValueError(f'Unknown source selection: {source_selection}, '
+                             f'possible values: {list(self._source_selections)}')
         super().__init__()
         self._forward_ordering = networkx.MultiDiGraph()
         self._reverse_ordering = networkx.MultiDiGraph()
+        # hop distances between all pairs of nodes in each ordering, -1 if there is no path.
+        #   Rows and columns are numbered by _node_index
+        self._node_index: Dict[str, int] = {}
+        self._forward_distances = np.zeros((0, 0), dtype=np.int16)
+        self._reverse_distances = np.zeros((0, 0), dtype=np.int16)
+        # bitsets of nodes reachable from each node (bit number is node index)
+        #   by going forward and then reverse (_forward_one_change) or reverse and then forward
+        self._forward_one_change: List[int] = []
+        self._reverse_one_change: List[int] = []
         # how much longer the found paths can be compared to the shortest hop path
         self._length_cutoff = length_cutoff_fraction
+        self._cache_size = cache_size
+        self._select_source = getattr(self, self._source_selections[source_selection])
+        self._cache: OrderedDict = OrderedDict()
 
     def _get_topology_edges_between_nodes(
                 self, topology: networkx.MultiDiGraph,
@@ -42,11 +80,49 @@ class DAGCalculator(BasePathCalculator):
                 max_len_node = node
         return max_len_node
 
+    @staticmethod
+    def _farthest_nodes(graph: networkx.Graph, node: str) -> Tuple[int, List[str]]:
+        # bfs from node, returns eccentricity of node and nodes at that distance
+        lengths = networkx.single_source_shortest_path_length(graph, node)
+        eccentricity = max(lengths.values())
+        return eccentricity, [other for other, length in lengths.items() if length == eccentricity]
+
+    def _double_sweep_node(self, graph: networkx.Graph) -> str:
+        # node farthest from a node that is farthest from an arbitrary node is close to the graph's periphery
+        start = next(iter(graph.nodes()))
+        _, farthest = self._farthest_nodes(graph, start)
+        _, farthest = self._farthest_nodes(graph, farthest[0])
+        return farthest[0]
+
+    def _pseudo_peripheral_node(self, graph: networkx.Graph) -> str:
+        # move to the farthest node with the smallest degree while eccentricity grows
+        node = next(iter(graph.nodes()))
+        eccentricity, farthest = self._farthest_nodes(graph, node)
+        while True:
+            candidate = min(farthest, key=graph.degree)
+            candidate_eccentricity, candidate_farthest = self._farthest_nodes(graph, candidate)
+            if candidate_eccentricity <= eccentricity:
+                return node
+            node, eccentricity, farthest = candidate, candidate_eccentricity, candidate_farthest
+
+    @staticmethod
+    def _topology_fingerprint(topology: networkx.MultiDiGraph) -> Hashable:
+        # only structure is used by path calculation, edge attributes (bandwidth, weights) are not part of it.
+        # order matters too: it decides dfs numbering, so a cached result is the same as a recalculated one
+        return tuple(topology.nodes), tuple(topology.edges(keys=True))
+
     def prepare_iteration(self, topology: networkx.MultiDiGraph) -> None:
-        # TODO: if topology did not change, do not recalculate graphs
-        #   or somehow pass the topology changes here
-        self._forward_ordering.clear()
-        self._reverse_ordering.clear()
+        fingerprint = self._topology_fingerprint(topology)
+        prepared = self._cache.get(fingerprint)
+        if prepared is not None:
+            self._cache.move_to_end(fingerprint)
+            for attribute, value in zip(self._prepared_attributes, prepared):
+                setattr(self, attribute, value)
+            return
+
+        # new graphs are created because previous ones may be in cache
+        self._forward_ordering = networkx.MultiDiGraph()
+        self._reverse_ordering = networkx.MultiDiGraph()
 
         # make topology graph undirected to apply the st-numbering algorithm
         # all pair of links (A-B, B-A) will be treated as a single undirected link
@@ -54,8 +130,8 @@ class DAGCalculator(BasePathCalculator):
 
         # use dfs to convert the graph into directed acyclic graph and this graph will be used by all nodes
         # how to choose source is a good question
-        # for now we will take the node that has the longest path in the graph
-        source_node = self._node_with_longest_path(undirected_topo)
+        # by default we take the node that has the longest path in the graph
+        source_node = self._select_source(undirected_topo)
         numbered_topo = self._dag_convert(undirected_topo, source_node)
 
         # using this dag, create two directed acyclic graphs from original topology
@@ -86,6 +162,22 @@ class DAGCalculator(BasePathCalculator):
                 for edge_index, edge_data in self._get_topology_edges_between_nodes(topology, neighbor_id, node_id):
                     self._reverse_ordering.add_edge(neighbor_id, node_id, key=edge_index, **edge_data)
 
+        self._node_index = {node: index for index, node in enumerate(self._forward_ordering.nodes)}
+        self._forward_distances = self._hop_distances(self._forward_ordering)
+        self._reverse_distances = self._hop_distances(self._reverse_ordering)
+        forward_reach = self._reachability(self._forward_ordering)
+        reverse_reach = self._reachability(self._reverse_ordering)
+        self._forward_one_change = self._reachability(self._forward_ordering, reverse_reach)
+        self._reverse_one_change = self._reachability(self._reverse_ordering, forward_reach)
+
+        # orderings are ready, so nexthops for all pairs of nodes can be precomputed
+        super().prepare_iteration(topology)
+
+        if self._cache_size > 0:
+            self._cache[fingerprint] = tuple(getattr(self, attribute) for attribute in self._prepared_attributes)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
     def _dag_convert(self, graph: networkx.Graph, s_node: str) -> networkx.DiGraph:
         # convert graph into directed acyclic graph using dfs search
         graph_nodes = graph.nodes(data=True)
@@ -105,6 +197,54 @@ class DAGCalculator(BasePathCalculator):
 
         return dag_graph
 
+    def _hop_distances(self, ordering: networkx.MultiDiGraph) -> np.ndarray:
+        """
+        hop distances from every node to every node of an ordering, -1 if there is no path
+        ordering is acyclic, so distances from a node are known once they are known for all its successors
+        """
+        number_of_nodes = len(self._node_index)
+        unreachable = np.iinfo(np.int16).max
+        distances = np.full((number_of_nodes, number_of_nodes), unreachable, dtype=np.int32)
+        for node in reversed(list(topological_sort(ordering))):
+            index = self._node_index[node]
+            for neighbor in ordering.successors(node):
+                np.minimum(distances[index], distances[self._node_index[neighbor]] + 1, out=distances[index])
+            distances[index, index] = 0
+        distances[distances >= unreachable] = -1
+        return distances.astype(np.int16)
+
+    def _reachability(self, ordering: networkx.MultiDiGraph, after_change: Optional[List[int]] = None) -> List[int]:
+        """
+        bitsets of nodes reachable from each node of an ordering, node itself included
+
+        :param after_change: if given, reachability in other ordering.
+            Then result is nodes reachable by going through this ordering and then changing direction once
+        """
+        reach = [0] * len(self._node_index)
+        for node in reversed(list(topological_sort(ordering))):
+            index = self._node_index[node]
+            nodes = (1 << index) if after_change is None else after_change[index]
+            for neighbor in ordering.successors(node):
+                nodes |= reach[self._node_index[neighbor]]
+            reach[index] = nodes
+        return reach
+
+    def _hop_distance(self, graph: networkx.MultiDiGraph, source: str, destination: str) -> Optional[int]:
+        """
+        length of the shortest hop path from source to destination in one of the orderings, None if there is no path
+        """
+        if graph is self._forward_ordering:
+            distances = self._forward_distances
+        elif graph is self._reverse_ordering:
+            distances = self._reverse_distances
+        else:
+            try:
+                return shortest_path_length(graph, source, destination)
+            except networkx.NetworkXNoPath:
+                return None
+        length = distances[self._node_index[source], self._node_index[destination]]
+        return None if length < 0 else int(length)
+
     def _find_possible_nexthops(self, topology: networkx.MultiDiGraph,
                                 source: str, destination: str, original_length: int) -> List[List[GraphPathElement]]:
         """
@@ -124,9 +264,8 @@ class DAGCalculator(BasePathCalculator):
                 continue
             checked_nexthops.add(neighbor)
 
-            try:
-                length = shortest_path_length(topology, neighbor, destination)
-            except networkx.NetworkXNoPath:
+            length = self._hop_distance(topology, neighbor, destination)
+            if length is None:
                 continue
             if length <= int(math.ceil(original_length * self._length_cutoff)):
                 possible_nexthops.append([GraphPathElement(from_=source, to_=neighbor, index=edge_index)])
@@ -162,8 +301,15 @@ class DAGCalculator(BasePathCalculator):
                 continue
             checked_nexthops.add(neighbor)
 
-            if (networkx.has_path(reverse_graph, neighbor, destination) or
-                    self._check_change_direction_path_possible(forward_graph, reverse_graph, neighbor, destination)):
+            if forward_graph is self._forward_ordering and reverse_graph is self._reverse_ordering:
+                possible = self._forward_one_change[self._node_index[neighbor]] >> self._node_index[destination] & 1
+            elif forward_graph is self._reverse_ordering and reverse_graph is self._forward_ordering:
+                possible = self._reverse_one_change[self._node_index[neighbor]] >> self._node_index[destination] & 1
+            else:
+                possible = (networkx.has_path(reverse_graph, neighbor, destination) or
+                            self._check_change_direction_path_possible(forward_graph, reverse_graph,
+                                                                       neighbor, destination))
+            if possible:
                 possible_nexthops.append([GraphPathElement(from_=source, to_=neighbor, index=edge_index)])
         return possible_nexthops
 
@@ -189,11 +335,9 @@ class DAGCalculator(BasePathCalculator):
             # source or destination was removed from topology
             raise networkx.NodeNotFound
 
-        try:
-            original_length = shortest_path_length(graph_to_use, source, destination)
+        original_length = self._hop_distance(graph_to_use, source, destination)
+        if original_length is not None:
             return self._find_possible_nexthops(graph_to_use, source, destination, original_length)
-        except networkx.NetworkXNoPath:
-            pass
 
         # if we are here there is no simple path from source to destination
         # now we look for a node that has a simple path
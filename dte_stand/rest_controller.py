@@ -7,15 +7,18 @@ from fastapi import FastAPI
 import uvicorn
 import dill
 from os.path import exists
+from typing import Any
 
 from main import build_controller
 from dte_stand.data_structures import Flows, Flow
 from dte_stand.hash_function.hash import HashFunction
 from dte_stand.hash_function.dxhash import WeightedDxHashFunction
 from dte_stand.hash_function.base import BaseHashFunction
-from dte_stand.algorithm.mate.lib.run_experiment import Runner
 from main import glob_var
 
+# actor exported by PPOAgent.save_model
+ACTOR_PATH = 'actor.npz'
+
 
 class Config:
     arbitrary_types_allowed = True
@@ -23,7 +26,8 @@ class Config:
 @pydantic.dataclasses.dataclass(config=Config)
 class Dataclass:
     hash_function: BaseHashFunction
-    runner: Runner
+    # Runner, it is imported only when an episode is trained, because it needs tensorflow
+    runner: Any
     current_flows: Flows
 
 app = FastAPI()
@@ -63,7 +67,9 @@ class RestController:
         with open('weights-' + str(time) + '.json', 'rb') as file:
             hash_weights = dill.load(file)
         current_flows = self.experiment_controller.input_data.flows.get(int(time))
-        current_topo, current_time = self.experiment_controller._get_current_topology_and_time(int(time))
+        # hash function writes current bandwidth into topology
+        current_topo, current_time = self.experiment_controller._get_current_topology_and_time(int(time),
+                                                                                               mutable=True)
         for flow in current_flows:
             if flow.start == start_node and flow.end == end_node:
                 return hash_function.run(current_topo, flow, hash_weights)
@@ -74,13 +80,39 @@ class RestController:
 
     @router.get("/run_new_episode/{time}")
     def run_new_episode(self, time):
+        from dte_stand.algorithm.mate.lib.run_experiment import Runner
         hash_function = WeightedDxHashFunction(self.experiment_controller.path_calculator)
         current_flows = self.experiment_controller.input_data.flows.get(int(time))
         current_topo, current_time = self.experiment_controller._get_current_topology_and_time(int(time))
         runner = Runner(current_topo, hash_function).agent
-        runner.env.get_current_flows(current_flows)
+        runner.envs.get_current_flows(current_flows)
         states, actions, rewards, log_probs, values, last_value, phi = runner.run_episode()
 
+    @router.get("/greedy_episode/{time}/{steps}")
+    def greedy_episode(self, time, steps, actor_path: str = ACTOR_PATH):
+        # trained actor runs with numpy, without loading tensorflow
+        from dte_stand.algorithm.mate.environment.environment import Environment
+        from dte_stand.algorithm.mate.lib.numpy_actor import NumpyActor
+        if not exists(actor_path):
+            return JSONResponse(
+                status_code=404,
+                content={"message": "Actor not found"},
+            )
+        hash_function = WeightedDxHashFunction(self.experiment_controller.path_calculator)
+        current_flows = self.experiment_controller.input_data.flows.get(int(time))
+        current_topo, current_time = self.experiment_controller._get_current_topology_and_time(int(time))
+        env = Environment(current_topo, hash_function, current_flows=current_flows)
+        actor = NumpyActor.load(actor_path)
+        actor.set_graph(env.G)
+        state = env.reset()
+        for _ in range(int(steps)):
+            state, reward = env.step(actor.act(state))
+        env._get_HashWeights()
+        file = 'weights-' + str(time) + '.json'
+        with open(file, 'wb') as fp:
+            dill.dump(env.hash_weights, fp)
+        return {"phi": env.calculate_phi(env.G)}
+
 
 app.include_router(router)
 if __name__ == "__main__":
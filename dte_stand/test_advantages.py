@@ -0,0 +1,43 @@
+import numpy as np
+
+from dte_stand.algorithm.mate.utils.advantages import gae_advantages
+
+import unittest
+
+GAMMA = 0.9
+GAE_LAMBDA = 0.8
+
+
+class TestGaeAdvantages(unittest.TestCase):
+    def setUp(self):
+        generator = np.random.default_rng(1)
+        self.rewards = generator.normal(size=(3, 6)).astype(np.float32)
+        self.values = generator.normal(size=(3, 6)).astype(np.float32)
+        self.last_values = generator.normal(size=3).astype(np.float32)
+
+    def _advantages_of_episode(self, rewards, values, last_value):
+        advantages, last_advantage = [], 0
+        for t in reversed(range(len(rewards))):
+            next_value = last_value if t == len(rewards) - 1 else values[t + 1]
+            last_advantage = rewards[t] + GAMMA * next_value - values[t] + GAMMA * GAE_LAMBDA * last_advantage
+            advantages.append(last_advantage)
+        return advantages[::-1]
+
+    def test_bootstrapped_trajectories(self):
+        returns, advantages = gae_advantages(self.rewards, self.values, self.last_values, GAMMA, GAE_LAMBDA)
+        for env in range(3):
+            expected = self._advantages_of_episode(self.rewards[env], self.values[env], self.last_values[env])
+            np.testing.assert_allclose(advantages[env], expected, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(returns, self.values + advantages, rtol=1e-6)
+
+    def test_episode_boundaries(self):
+        dones = np.zeros((3, 6), dtype=bool)
+        dones[1, 2] = True
+        _, advantages = gae_advantages(self.rewards, self.values, self.last_values, GAMMA, GAE_LAMBDA, dones)
+
+        # episode that ended at step 2 is not bootstrapped, the next one starts from scratch
+        first = self._advantages_of_episode(self.rewards[1, :3], self.values[1, :3], 0.0)
+        second = self._advantages_of_episode(self.rewards[1, 3:], self.values[1, 3:], self.last_values[1])
+        np.testing.assert_allclose(advantages[1], first + second, rtol=1e-5, atol=1e-6)
+        expected = self._advantages_of_episode(self.rewards[0], self.values[0], self.last_values[0])
+        np.testing.assert_allclose(advantages[0], expected, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,43 @@
+import networkx
+import numpy as np
+
+from dte_stand.algorithm.mate.lib.actor import Actor
+from dte_stand.algorithm.mate.lib.critic import Critic
+
+import unittest
+
+
+class TestBatchedNetworks(unittest.TestCase):
+    def setUp(self):
+        self.graph = networkx.MultiDiGraph()
+        self.graph.add_edges_from([('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'b')])
+        # link 3 gets no messages
+        self.graph.add_node('graph_data', incoming_links=[0, 1, 2, 3], outcoming_links=[1, 0, 1, 2])
+        self.states = np.random.default_rng(1).uniform(size=(3, 8)).astype(np.float32)
+
+    def test_batch_gives_results_of_each_state(self):
+        for aggregation in ('sum', 'min_max'):
+            with self.subTest(aggregation=aggregation):
+                actor = Actor(self.graph, num_features=2, aggregation=aggregation, message_iterations=2)
+                actor.build()
+                critic = Critic(self.graph, num_features=2, aggregation=aggregation, message_iterations=2)
+                critic.build()
+                logits = actor(self.states).numpy()
+                values = critic(self.states).numpy()
+                self.assertEqual(logits.shape, (3, 4))
+                self.assertEqual(values.shape, (3,))
+                for i, state in enumerate(self.states):
+                    np.testing.assert_allclose(logits[i], actor(state).numpy(), rtol=1e-5, atol=1e-6)
+                    np.testing.assert_allclose(values[i], critic(state).numpy()[0], rtol=1e-5, atol=1e-6)
+
+    def test_one_state_keeps_shapes(self):
+        actor = Actor(self.graph, num_features=2, message_iterations=2)
+        actor.build()
+        critic = Critic(self.graph, num_features=2, message_iterations=2)
+        critic.build()
+        self.assertEqual(actor(self.states[0]).shape, [4])
+        self.assertEqual(critic(self.states[0]).shape, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
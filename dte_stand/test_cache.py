@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import networkx
+import numpy as np
+
+from dte_stand.data_structures import InputData
+from dte_stand.data_structures.cache import ExperimentCache
+
+import unittest
+
+INPUTS_PATH = 'data_examples'
+
+
+class TestExperimentCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        for name in ('flows0.log', 'huawei.gml', 'topology_changes.json'):
+            shutil.copy(os.path.join(INPUTS_PATH, name), self.folder)
+
+    def inputs(self, input_data: InputData):
+        topology, change_time = input_data.topology.get(50000)
+        flows = input_data.flows.get(60000)
+        return (list(topology.nodes(data=True)), list(topology.edges(keys=True, data=True)), change_time,
+                [(flow.flow_id, flow.start, flow.end, flow.bandwidth, flow.all_bandwidth) for flow in flows])
+
+    def test_cached_inputs_are_the_same(self):
+        expected = self.inputs(InputData(self.folder, use_cache=False))
+        self.assertEqual(self.inputs(InputData(self.folder)), expected)
+        self.assertTrue(os.path.exists(os.path.join(self.folder, '.dte_cache', 'manifest.json')))
+
+        cached = InputData(self.folder)
+        self.assertEqual(self.inputs(cached), expected)
+        self.assertIsInstance(cached.flows.table.start_time, np.memmap)
+
+    def test_changed_file_is_parsed_again(self):
+        InputData(self.folder).flows
+        path = os.path.join(self.folder, 'flows0.log')
+        with open(path) as f:
+            text = f.read()
+        # same size, so only hash can tell the difference
+        with open(path, 'w') as f:
+            f.write(text.replace('"start_time": 0,', '"start_time": 1,', 1))
+        self.assertEqual(InputData(self.folder).flows.table.start_time[0], 1)
+
+    def test_topology_that_can_not_be_stored_is_parsed_again(self):
+        path = os.path.join(self.folder, 'huawei.gml')
+        for bandwidths in ([10, 2.5], [10, 2 ** 70]):
+            topology = networkx.MultiDiGraph()
+            topology.add_edge('a', 'b', bandwidth=bandwidths[0])
+            topology.add_edge('b', 'a', bandwidth=bandwidths[1])
+            parsed = []
+
+            def parse():
+                parsed.append(True)
+                return topology
+
+            for _ in range(2):
+                result = ExperimentCache(self.folder).topology(path, parse)
+                self.assertEqual(list(result.edges(data='bandwidth')), [('a', 'b', bandwidths[0]),
+                                                                        ('b', 'a', bandwidths[1])])
+            self.assertEqual(len(parsed), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import networkx
+
+from dte_stand.paths.dag_calculator import DAGCalculator
+from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from dte_stand.data_structures import HashWeights, Flow
+
+import unittest
+from unittest import mock
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+
+
+def read_topology():
+    with open(TOPOLOGY_PATH, 'rb') as f:
+        return networkx.readwrite.read_gml(f)
+
+
+class TestForwardingTable(unittest.TestCase):
+    def setUp(self):
+        self.topology = read_topology()
+        self.calculator = DAGCalculator()
+        self.calculator.prepare_iteration(self.topology)
+
+    def test_table_matches_calculate(self):
+        for node in self.topology.nodes:
+            for destination in self.topology.nodes:
+                if node == destination:
+                    continue
+                expected = [path[0] for path in self.calculator.calculate(self.topology, node, destination)]
+                self.assertEqual(self.calculator.forwarding_table.get(node, destination), expected)
+
+    def test_missing_node_is_not_in_table(self):
+        self.assertIsNone(self.calculator.forwarding_table.get('0', 'missing'))
+        with self.assertRaises(networkx.NodeNotFound):
+            self.calculator.get_nexthops(self.topology, '0', 'missing')
+
+    def test_flow_path_does_not_calculate(self):
+        hash_function = WeightedDxHashFunction(self.calculator)
+        flow = Flow(start='0', end='15', all_bandwidth={'0': 10}, start_time=0, end_time=10, bandwidth=10)
+        with mock.patch.object(self.calculator, 'calculate', side_effect=AssertionError) as calculate:
+            path = hash_function._flow_path(self.topology, flow, HashWeights(), flow.start)
+        calculate.assert_not_called()
+        self.assertEqual(path[0].from_, '0')
+        self.assertEqual(path[-1].to_, '15')
+
+
+class TestDirectionChange(unittest.TestCase):
+    def test_index_matches_graph_search(self):
+        topology = read_topology()
+        # without links going out of these nodes many pairs have no simple path in their ordering
+        topology.remove_edges_from([edge for edge in list(topology.edges(keys=True)) if edge[0] in ('3', '7')])
+        calculator = DAGCalculator()
+        calculator.prepare_iteration(topology)
+        forward, reverse = calculator._forward_ordering, calculator._reverse_ordering
+        for node in topology.nodes:
+            for destination in topology.nodes:
+                for first, second in ((forward, reverse), (reverse, forward)):
+                    indexed = calculator._find_nexthops_with_change_direction(first, second, node, destination)
+                    searched = calculator._find_nexthops_with_change_direction(
+                            first.copy(), second.copy(), node, destination)
+                    self.assertEqual(indexed, searched)
+
+
+class TestSourceSelection(unittest.TestCase):
+    def test_every_pair_has_nexthops(self):
+        topology = read_topology()
+        for source_selection in ('longest_path', 'double_sweep', 'pseudo_peripheral'):
+            calculator = DAGCalculator(source_selection=source_selection)
+            calculator.prepare_iteration(topology)
+            for (node, destination), nexthops in calculator.forwarding_table.nexthops.items():
+                self.assertTrue(nexthops, (source_selection, node, destination))
+                self.assertTrue(all(nexthop.from_ == node for nexthop in nexthops))
+
+    def test_peripheral_node_of_path_graph(self):
+        graph = networkx.path_graph(['a', 'b', 'c', 'd', 'e'])
+        calculator = DAGCalculator()
+        self.assertIn(calculator._double_sweep_node(graph), ('a', 'e'))
+        self.assertIn(calculator._pseudo_peripheral_node(graph), ('a', 'e'))
+
+    def test_unknown_selection(self):
+        with self.assertRaises(ValueError):
+            DAGCalculator(source_selection='random')
+
+
+class TestHopDistances(unittest.TestCase):
+    def test_same_as_shortest_paths(self):
+        calculator = DAGCalculator()
+        calculator.prepare_iteration(read_topology())
+        for ordering in (calculator._forward_ordering, calculator._reverse_ordering):
+            distances = calculator._hop_distances(ordering)
+            expected = dict(networkx.all_pairs_shortest_path_length(ordering))
+            for node_from, node_from_index in calculator._node_index.items():
+                for node_to, node_to_index in calculator._node_index.items():
+                    self.assertEqual(distances[node_from_index, node_to_index],
+                                     expected[node_from].get(node_to, -1), (node_from, node_to))
+
+
+class TestOrderingsCache(unittest.TestCase):
+    def setUp(self):
+        self.topology = read_topology()
+
+    def test_same_structure_reuses_orderings(self):
+        calculator = DAGCalculator()
+        calculator.prepare_iteration(self.topology)
+        forward, table = calculator._forward_ordering, calculator.forwarding_table
+
+        changed_attributes = self.topology.copy()
+        for _, _, edge_data in changed_attributes.edges(data=True):
+            edge_data['current_bandwidth'] = 100
+        with mock.patch.object(calculator, '_dag_convert', side_effect=AssertionError) as dag_convert:
+            calculator.prepare_iteration(changed_attributes)
+        dag_convert.assert_not_called()
+        self.assertIs(calculator._forward_ordering, forward)
+        self.assertIs(calculator.forwarding_table, table)
+
+    def test_changed_structure_is_recalculated(self):
+        calculator = DAGCalculator(cache_size=1)
+        calculator.prepare_iteration(self.topology)
+        forward = calculator._forward_ordering
+
+        smaller = self.topology.copy()
+        smaller.remove_node('15')
+        calculator.prepare_iteration(smaller)
+        self.assertNotIn('15', calculator._forward_ordering)
+        self.assertIsNone(calculator.forwarding_table.get('0', '15'))
+
+        # first topology was evicted
+        calculator.prepare_iteration(self.topology)
+        self.assertIsNot(calculator._forward_ordering, forward)
+        self.assertIsNotNone(calculator.forwarding_table.get('0', '15'))
+
+
+if __name__ == "__main__":
+    unittest.main()
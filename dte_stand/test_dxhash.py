@@ -1,7 +1,13 @@
 from dte_stand.data_structures.paths import GraphPathElement
 from dte_stand.data_structures.hash_weights import Bucket
 from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from dte_stand.hash_function.batch import BatchRouting
+from dte_stand.data_structures import Flows, CompactHashWeights
+from dte_stand.paths import DAGCalculator
+import networkx
 import uuid
+import random
+from collections import Counter
 
 import unittest
 
@@ -90,6 +96,73 @@ class TestWeightedDxHash(unittest.TestCase):
         nexthop = self.hash._choose_nexthop(self.hash_weights, self.flow_id)
         self.assertEqual(self.get_edge(nexthop), ("Riga", "Copenhagen", 13))
 
+    def test_same_flow_same_nexthop(self):
+        self.fill_buckets(6)
+        nexthop = self.hash._choose_nexthop(self.hash_weights, self.flow_id)
+        other_hash = WeightedDxHashFunction(self.hash_weights)
+        for _ in range(10):
+            self.assertEqual(other_hash._choose_nexthop(self.hash_weights, self.flow_id), nexthop)
+
+    def test_global_random_state_is_untouched(self):
+        self.fill_buckets(4)
+        state = random.getstate()
+        self.hash._choose_nexthop(self.hash_weights, self.flow_id)
+        self.assertEqual(random.getstate(), state)
+
+    def test_weighted_distribution(self):
+        buckets = [Bucket(GraphPathElement("A", "B", 0), 1),
+                   Bucket(GraphPathElement("A", "C", 0), 3),
+                   Bucket(GraphPathElement("A", "D", 0), 0)]
+        hash_function = WeightedDxHashFunction(buckets)
+        counter = Counter(hash_function._choose_nexthop(buckets, str(i)).to_ for i in range(4000))
+        self.assertNotIn("D", counter)
+        self.assertAlmostEqual(counter["C"] / counter["B"], 3, delta=0.5)
+
+
+class TestBatchHashing(unittest.TestCase):
+    def setUp(self):
+        with open('data_examples/huawei.gml', 'rb') as f:
+            self.topology = networkx.readwrite.read_gml(f)
+        path_calculator = DAGCalculator()
+        path_calculator.prepare_iteration(self.topology)
+        self.hash = WeightedDxHashFunction(path_calculator)
+        self.flows = Flows('data_examples/flows0.log').get(0)
+        links = list(self.topology.edges(keys=True))
+        self.hash_weights = CompactHashWeights(dict(enumerate(links)), [i % 4 for i in range(len(links))])
+
+    def test_batch_matches_run(self):
+        flow_paths = self.hash.run(self.topology, self.flows, self.hash_weights, False)
+        loads = {(u, v, k): data['current_bandwidth'] for u, v, k, data in self.topology.edges(keys=True, data=True)}
+
+        routing = BatchRouting(self.topology, self.hash.path_calculator)
+        result = self.hash.run_batch(self.topology, self.flows, self.hash_weights, routing=routing)
+        for edge, load in loads.items():
+            self.assertAlmostEqual(self.topology.edges[edge]['current_bandwidth'], load)
+        for i, flow in enumerate(self.flows):
+            self.assertEqual(bool(result.routed[i]), flow.flow_id in flow_paths)
+            if flow.flow_id in flow_paths:
+                path = [routing.link_index[(e.from_, e.to_, e.index)] for e in flow_paths[flow.flow_id]]
+                self.assertEqual(list(result.paths[i][result.paths[i] >= 0]), path)
+
+    def test_reroute_matches_full_run(self):
+        routing = BatchRouting(self.topology, self.hash.path_calculator)
+        flows = routing.flow_batch(self.flows)
+        result = self.hash.run_batch(self.topology, flows, self.hash_weights, routing=routing)
+        for step in range(50):
+            link_id = step * 7 % len(routing.links)
+            self.hash_weights.set_link_weight(link_id, step % 5)
+            result = self.hash.reroute_batch(self.topology, flows, self.hash_weights, routing.links[link_id][0],
+                                             result, routing=routing)
+            loads = {(u, v, k): data['current_bandwidth'] for u, v, k, data in self.topology.edges(keys=True, data=True)}
+            expected = self.hash.run_batch(self.topology, flows, self.hash_weights, routing=routing)
+            self.assertEqual(list(result.link_loads), list(expected.link_loads))
+            self.assertEqual(list(result.routed), list(expected.routed))
+            for i in range(len(flows)):
+                self.assertEqual(list(result.paths[i][result.paths[i] >= 0]),
+                                 list(expected.paths[i][expected.paths[i] >= 0]))
+            for edge, load in loads.items():
+                self.assertEqual(self.topology.edges[edge]['current_bandwidth'], load)
+
 
 if __name__ == "__main__":
     unittest.main()
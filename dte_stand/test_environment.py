@@ -0,0 +1,79 @@
+import networkx
+import numpy as np
+
+from dte_stand.algorithm.mate.environment.environment import Environment
+from dte_stand.data_structures import Flows, HashWeights
+from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from dte_stand.paths.dag_calculator import DAGCalculator
+
+import unittest
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+FLOWS_PATH = 'data_examples/flows0.log'
+# links that move traffic, and link 1 that already has the largest weight, so rewards change
+ACTIONS = [10, 1, 1, 31, 21, 21, 57]
+
+
+def graph_attribute_steps(env: Environment, flows, actions):
+    """
+    States and rewards of steps of env, with link state kept in attributes of the graph as the environment kept it
+        before link arrays. Weights change by sum, reward is the change of the largest weight
+    """
+    graph = env.G.copy()
+    link_ids_dict = graph.nodes()['graph_data']['link_ids_dict']
+    for link_id, link in link_ids_dict.items():
+        graph.edges[link]['weight'] = float(env.init_weights[link_id])
+    links = [link_ids_dict[link_id] for link_id in range(env.n_links)]
+    reward_measure = max(graph.edges[link]['weight'] for link in links)
+    states, rewards = [], []
+    for action in actions:
+        graph.edges[link_ids_dict[action]]['weight'] += env.weight_change
+        hash_weights = HashWeights()
+        for start_node in graph.nodes():
+            for end_node in graph.nodes():
+                if start_node == end_node:
+                    continue
+                for edge_start, edge_end, edge_index in graph.edges(nbunch=start_node, keys=True):
+                    hash_weights.put(edge_start, end_node, edge_end, edge_index,
+                                     graph.edges[edge_start, edge_end, edge_index]['weight'])
+        env.hash_function.run(graph, flows, hash_weights, False)
+        link_traffic = [graph.edges[link]['current_bandwidth'] / graph.edges[link]['bandwidth'] for link in links]
+        weights = [graph.edges[link]['weight'] / (env.max_weight * 3) for link in links]
+        states.append(np.array(link_traffic + weights, dtype=np.float32))
+        current_measure = max(graph.edges[link]['weight'] for link in links)
+        rewards.append(reward_measure - current_measure)
+        reward_measure = current_measure
+    return states, rewards
+
+
+class TestEnvironment(unittest.TestCase):
+    def setUp(self):
+        with open(TOPOLOGY_PATH, 'rb') as f:
+            topology = networkx.readwrite.read_gml(f)
+        path_calculator = DAGCalculator()
+        path_calculator.prepare_iteration(topology)
+        self.env = Environment(topology, WeightedDxHashFunction(path_calculator))
+        self.flows = Flows(FLOWS_PATH).get(0)
+        self.env.get_current_flows(self.flows)
+        self.env.reset()
+
+    def test_same_steps_as_graph_attributes(self):
+        expected_states, expected_rewards = graph_attribute_steps(self.env, self.flows, ACTIONS)
+        self.assertFalse(np.array_equal(expected_states[0], expected_states[-1]))
+        self.assertIn(-1., expected_rewards)
+        for action, expected_state, expected_reward in zip(ACTIONS, expected_states, expected_rewards):
+            state, reward = self.env.step(action)
+            np.testing.assert_allclose(state, expected_state, rtol=1e-6)
+            self.assertAlmostEqual(reward, expected_reward)
+
+    def test_state_buffer_is_reused(self):
+        state = self.env.get_state()
+        saved = state.copy()
+        next_state, _ = self.env.step(ACTIONS[0])
+        # the next state is written into the same buffer, only the copy keeps the previous state
+        self.assertIs(next_state, state)
+        self.assertFalse(np.array_equal(state, saved))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import io
+import json
+import os
+import random
+import tempfile
+import numpy as np
+
+from dte_stand.data_structures import Flows, Flow, FlowTable
+from dte_stand.data_structures.intervals import IntervalIndex
+from dte_stand.data_structures.flow_loader import iter_json_array
+
+import unittest
+
+FLOWS_PATH = 'data_examples/flows0.log'
+
+
+def write_flows(flows):
+    flows_file = tempfile.NamedTemporaryFile('w', suffix='.log', delete=False)
+    with flows_file:
+        json.dump(flows, flows_file)
+    return flows_file.name
+
+
+class TestIntervalIndex(unittest.TestCase):
+    def test_query_matches_scan(self):
+        rng = random.Random(1)
+        starts = [rng.randrange(0, 1000) for _ in range(500)]
+        ends = [start + rng.randrange(1, 200) for start in starts]
+        index = IntervalIndex(np.array(starts), np.array(ends))
+        for point in range(-5, 1250, 7):
+            expected = [i for i, (start, end) in enumerate(zip(starts, ends)) if start <= point < end]
+            self.assertEqual(list(index.query(point)), expected)
+
+
+class TestFlows(unittest.TestCase):
+    def setUp(self):
+        path = write_flows([
+            {'start': '0', 'end': '1', 'all_bandwidth': {'0': 10, '20000': 30, '5000': 20},
+             'start_time': 0, 'end_time': 30000},
+            {'start': '1', 'end': '2', 'all_bandwidth': {'10000': 5}, 'start_time': 10000, 'end_time': 20000},
+            {'start': '2', 'end': '0', 'all_bandwidth': {'15000': 7}, 'start_time': 5000, 'end_time': 40000},
+        ])
+        self.addCleanup(os.remove, path)
+        self.flows = Flows(path)
+
+    def active(self, flows):
+        return [(flow.start, flow.bandwidth) for flow in flows]
+
+    def test_latest_bandwidth_by_time(self):
+        self.assertEqual(self.active(self.flows.get(0)), [('0', 10)])
+        self.assertEqual(self.active(self.flows.get(9999)), [('0', 20)])
+        self.assertEqual(self.active(self.flows.get(25000)), [('0', 30), ('2', 7)])
+        self.assertEqual(self.active(self.flows.get(40000)), [])
+
+    def test_flow_without_bandwidth_yet_is_skipped(self):
+        self.assertEqual(self.active(self.flows.get(12000)), [('0', 20), ('1', 5)])
+
+    def test_sweep_matches_get(self):
+        flows = Flows(FLOWS_PATH)
+        sweep = flows.sweep()
+        for current_time in range(0, 200000, 1500):
+            expected = [(flow.flow_id, flow.bandwidth) for flow in flows.get(current_time)]
+            self.assertEqual([(flow.flow_id, flow.bandwidth) for flow in sweep.advance(current_time)], expected)
+        with self.assertRaises(ValueError):
+            sweep.advance(0)
+
+
+class TestFlowTable(unittest.TestCase):
+    def test_records_read_from_table(self):
+        flows = [Flow(start='0', end='1', all_bandwidth={'0': 10, '100': 20}, start_time=0, end_time=200),
+                 Flow(start='1', end='0', all_bandwidth={'50': 5}, start_time=50, end_time=100)]
+        table = FlowTable.from_flows(flows)
+        # second flow has no bandwidth yet
+        view = table.view(np.arange(len(table)), 40)
+        self.assertEqual(len(view), 1)
+        view = table.view(np.arange(len(table)), 120)
+        record = view[0]
+        self.assertEqual((record.start, record.end, record.flow_id, record.bandwidth),
+                         ('0', '1', flows[0].flow_id, 20))
+        self.assertEqual(record.all_bandwidth, {'0': 10, '100': 20})
+        self.assertEqual(list(table.bandwidth_at(np.array([1, 0]), 60)), [5, 10])
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            FlowTable.from_records([{'start': '0', 'end': '0', 'all_bandwidth': {'0': 1},
+                                     'start_time': 0, 'end_time': 10}])
+        with self.assertRaises(ValueError):
+            FlowTable.from_records([{'start': '0', 'end': '1', 'all_bandwidth': {'0': 0},
+                                     'start_time': 0, 'end_time': 10}])
+        with self.assertRaisesRegex(ValueError, 'missing: flow f1'):
+            FlowTable.from_records([{'start': '0', 'end': '1', 'all_bandwidth': {'0': 1},
+                                     'start_time': 0, 'flow_id': 'f1'}])
+        for record in ({'all_bandwidth': {'0': 1.5}, 'start_time': 0}, {'all_bandwidth': {'0': 1}, 'start_time': 0.5},
+                       {'all_bandwidth': {'0.5': 1}, 'start_time': 0}):
+            with self.assertRaisesRegex(ValueError, 'must be an integer.*flow f2'):
+                FlowTable.from_records([dict(record, start='0', end='1', end_time=10, flow_id='f2')])
+        # integers written as strings are read as Flow reads them
+        table = FlowTable.from_records([{'start': '0', 'end': '1', 'all_bandwidth': {'0': '3'},
+                                         'start_time': '0', 'end_time': 10}])
+        self.assertEqual(table.all_bandwidth(0), {'0': 3})
+
+
+class TestFlowLoader(unittest.TestCase):
+    def test_chunks_match_json(self):
+        with open(FLOWS_PATH) as f:
+            text = f.read()
+        expected = json.loads(text)
+        for chunk_size in (5, 333, 1 << 20):
+            self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size)), expected)
+        self.assertEqual(list(iter_json_array(io.StringIO('[ 12, [3], "]" ]'), 2)), [12, [3], ']'])
+
+    def test_malformed_array(self):
+        for text in ('{"a": 1}', '[1, 2', '[1 2]'):
+            with self.assertRaises(ValueError):
+                list(iter_json_array(io.StringIO(text), 2))
+
+    def test_time_window(self):
+        with open(FLOWS_PATH) as f:
+            expected = [flow['flow_id'] for flow in json.load(f)
+                        if flow['start_time'] < 60000 and flow['end_time'] > 50000]
+        flows = Flows(FLOWS_PATH, time_window=(50000, 60000))
+        self.assertEqual([flows.table.flow_id(flow) for flow in range(len(flows.table))], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import networkx
+import numpy as np
+
+from dte_stand.algorithm.mate.lib.graph_inputs import PaddedGraph, bucket_size
+
+import unittest
+
+
+class TestPaddedGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = networkx.MultiDiGraph()
+        self.graph.add_edges_from([('a', 'b'), ('b', 'a'), ('b', 'c')])
+        self.graph.add_node('graph_data', incoming_links=[0, 1, 0], outcoming_links=[1, 0, 2])
+        # graph_data node is not a link, edges are counted only
+        self.padded = PaddedGraph(self.graph, num_features=2, min_links=4, min_pairs=4)
+
+    def test_bucket_size(self):
+        self.assertEqual(bucket_size(3, 16), 16)
+        self.assertEqual(bucket_size(16, 16), 16)
+        self.assertEqual(bucket_size(17, 16), 32)
+
+    def test_padding_links_are_masked(self):
+        inputs = self.padded.inputs
+        self.assertEqual(self.padded.n_padded, 4)
+        self.assertEqual(inputs.link_mask.numpy().tolist(), [True, True, True, False])
+        # message of the padding pair goes to the dropped segment
+        self.assertEqual(inputs.segment_ids.numpy().tolist(), [1, 0, 2, 4])
+        self.assertEqual(inputs.incoming_links.numpy().tolist(), [0, 1, 0, 0])
+
+    def test_pad_states_keeps_features_of_links(self):
+        states = np.array([[1, 2, 3, 4, 5, 6]], dtype=np.float32)
+        np.testing.assert_array_equal(self.padded.pad_states(states), [[1, 2, 3, 0, 4, 5, 6, 0]])
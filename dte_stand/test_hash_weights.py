@@ -0,0 +1,56 @@
+from dte_stand.data_structures import HashWeights, CompactHashWeights
+
+import unittest
+
+# two parallel links from a to b, and a link to c that goes before them by link id
+LINKS = {
+    0: ('a', 'c', 0),
+    1: ('a', 'b', 0),
+    2: ('a', 'b', 1),
+    3: ('b', 'a', 0),
+    4: ('c', 'a', 0),
+}
+WEIGHTS = [1.0, 2.0, 3.0, 4.0, 5.0]
+NODES = ('a', 'b', 'c')
+
+
+class TestCompactHashWeights(unittest.TestCase):
+    def setUp(self):
+        self.compact = CompactHashWeights(LINKS, WEIGHTS)
+        self.hash_weights = HashWeights()
+        for link_id, (start_node, neighbor_node, edge_index) in LINKS.items():
+            for end_node in NODES:
+                if end_node != start_node:
+                    self.hash_weights.put(start_node, end_node, neighbor_node, edge_index, WEIGHTS[link_id])
+
+    def test_same_buckets_as_hash_weights(self):
+        for start_node in NODES:
+            for end_node in NODES:
+                self.assertEqual(self.compact.get_bucket_list(start_node, end_node),
+                                 self.hash_weights.get_bucket_list(start_node, end_node))
+        self.assertEqual([(bucket.edge.to_, bucket.edge.index) for bucket in self.compact.get_bucket_list('a', 'b')],
+                         [('b', 0), ('b', 1), ('c', 0)])
+        self.assertEqual(dict(self.compact.weights), dict(self.hash_weights.weights))
+
+    def test_get_weight(self):
+        self.assertEqual(self.compact.get_weight('a', 'c', 'b', 1), 3.0)
+        self.assertEqual(self.compact.get_weight('a', 'c', 'b', 1), self.hash_weights.get_weight('a', 'c', 'b', 1))
+        # unknown link and unknown pair of nodes
+        self.assertIsNone(self.compact.get_weight('a', 'c', 'b', 2))
+        self.assertIsNone(self.compact.get_weight('a', 'd', 'b', 0))
+        self.assertIsNone(self.hash_weights.get_weight('a', 'd', 'b', 0))
+
+    def test_weight_of_link_is_shared_by_destinations(self):
+        self.compact.put('a', 'b', 'b', 1, 7.0)
+        self.assertEqual(self.compact.get_weight('a', 'c', 'b', 1), 7.0)
+
+    def test_copy_keeps_original_weights(self):
+        copied = self.compact.copy()
+        copied.set_link_weight(2, 10.0)
+        self.assertEqual(copied.get_weight('a', 'b', 'b', 1), 10.0)
+        self.assertEqual(self.compact.get_weight('a', 'b', 'b', 1), 3.0)
+        self.assertEqual(self.compact.weight_vector.tolist(), WEIGHTS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+import dte_stand.algorithm
+import dte_stand.paths
+
+import unittest
+
+# modules of the MATE algorithm that other configurations must not load
+RL_MODULES = ('tensorflow', 'tensorflow_probability', 'keras', 'gin')
+
+
+def _run_in_new_interpreter(statements: str) -> dict:
+    # a new interpreter, because tests run earlier in this process may have imported anything
+    code = ('import json, sys\n'
+            f'{statements}\n'
+            'print(json.dumps({"modules": sorted(sys.modules)}))\n')
+    result = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_dummy_configuration_starts_without_tensorflow(self):
+        result = _run_in_new_interpreter(
+            'from main import dynamic_import\n'
+            'path_calculator = dynamic_import("dte_stand.paths.DummyPathCalculator")\n'
+            'hash_function = dynamic_import("dte_stand.hash_function.DummyHashFunction", '
+            'path_calculator=path_calculator)\n'
+            'dynamic_import("dte_stand.algorithm.DummyAlgorithm", hash_function=hash_function)')
+        self.assertEqual([module for module in RL_MODULES if module in result['modules']], [])
+
+    def test_implementations_are_imported_on_first_use(self):
+        result = _run_in_new_interpreter('import dte_stand.algorithm, dte_stand.hash_function, dte_stand.paths')
+        for module in ('dte_stand.algorithm.mate_run', 'dte_stand.hash_function.dxhash',
+                       'dte_stand.paths.dag_calculator'):
+            self.assertNotIn(module, result['modules'])
+
+    def test_package_attributes(self):
+        from dte_stand.paths.dag_calculator import DAGCalculator
+        self.assertIs(dte_stand.paths.DAGCalculator, DAGCalculator)
+        self.assertIn('MateAlgorithm', dir(dte_stand.algorithm))
+        with self.assertRaises(AttributeError):
+            dte_stand.algorithm.UnknownAlgorithm
@@ -0,0 +1,39 @@
+import random
+import networkx
+
+from dte_stand.data_structures import LinkLoads
+
+import unittest
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+
+
+class TestLinkLoads(unittest.TestCase):
+    def setUp(self):
+        self.topology = networkx.MultiDiGraph(networkx.read_gml(TOPOLOGY_PATH))
+        generator = random.Random(1)
+        for _, _, edge_data in self.topology.edges(data=True):
+            edge_data['current_bandwidth'] = generator.randint(0, edge_data['bandwidth'])
+
+    def test_phi_matches_deviation_of_utilization(self):
+        utilization = [float(edge_data['current_bandwidth']) / edge_data['bandwidth']
+                       for _, _, edge_data in self.topology.edges(data=True)]
+        average = sum(utilization) / len(utilization)
+        phi = sum(pow(value - average, 2) for value in utilization) / len(utilization)
+
+        stats = LinkLoads.from_topology(self.topology).stats()
+        self.assertAlmostEqual(stats.phi, phi, places=12)
+        self.assertAlmostEqual(stats.mean_utilization, average, places=12)
+        self.assertAlmostEqual(stats.std_utilization, phi ** 0.5, places=12)
+        self.assertEqual(stats.max_utilization, max(utilization))
+        self.assertEqual(stats.min_utilization, min(utilization))
+
+    def test_loads_follow_link_order(self):
+        links = sorted(self.topology.edges(keys=True), reverse=True)
+        link_loads = LinkLoads.from_topology(self.topology, links=links)
+        self.assertEqual(link_loads.loads.tolist(),
+                         [self.topology.edges[link]['current_bandwidth'] for link in links])
+
+        link_loads.set_loads(link_loads.capacities)
+        self.assertTrue((link_loads.utilization() == 1).all())
+        self.assertEqual(link_loads.stats().phi, 0)
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import networkx
+import tensorflow as tf
+
+from dte_stand.algorithm.mate_run import MateAlgorithm
+from dte_stand.algorithm.mate.agents.ppo_agent import PPOAgent
+from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from dte_stand.paths.dag_calculator import DAGCalculator
+
+import unittest
+from unittest import mock
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+
+
+def _train_one_update(agent, topology, current_flows, hash_function, iteration):
+    # training is replaced by one update of the optimizer, so the test does not trace training functions
+    agent.apply_grads([tf.zeros_like(variable) for variable in agent._trainable_variables()])
+    return None, {}
+
+
+class TestMateAlgorithm(unittest.TestCase):
+    def setUp(self):
+        with open(TOPOLOGY_PATH, 'rb') as f:
+            self.topology = networkx.readwrite.read_gml(f)
+        path_calculator = DAGCalculator()
+        path_calculator.prepare_iteration(self.topology)
+        self.algorithm = MateAlgorithm(WeightedDxHashFunction(path_calculator))
+        # runner writes logs, checkpoints and hash weights into the current directory
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_agent_is_kept_between_steps(self):
+        with mock.patch.object(PPOAgent, 'train_and_evaluate', autospec=True, side_effect=_train_one_update):
+            self.algorithm.step(self.topology, [], iteration=0)
+            runner = self.algorithm._runners[0]
+            agent = runner.agent
+            self.assertEqual(int(agent.optimizer.iterations), 1)
+
+            self.algorithm.step(self.topology, [], iteration=1)
+        self.assertIs(self.algorithm._runners[0], runner)
+        self.assertIs(runner.agent, agent)
+        self.assertEqual(runner.experiments, 2)
+        self.assertEqual(int(agent.optimizer.iterations), 2)
+
+    def test_agents_of_subgraphs_train_in_one_process(self):
+        with mock.patch.object(PPOAgent, 'train_and_evaluate', autospec=True, side_effect=_train_one_update):
+            self.algorithm.step(self.topology, [], iteration=0, i=0)
+            self.algorithm.step(self.topology, [], iteration=0, i=1)
+        first, second = self.algorithm._runners[0].agent, self.algorithm._runners[1].agent
+        self.assertIsNot(first.optimizer, second.optimizer)
+        self.assertEqual([int(first.optimizer.iterations), int(second.optimizer.iterations)], [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
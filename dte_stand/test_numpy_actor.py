@@ -0,0 +1,29 @@
+import os
+import tempfile
+import networkx
+import numpy as np
+
+from dte_stand.algorithm.mate.lib.actor import Actor
+from dte_stand.algorithm.mate.lib.numpy_actor import NumpyActor, export_actor
+
+import unittest
+
+
+class TestNumpyActor(unittest.TestCase):
+    def setUp(self):
+        graph = networkx.MultiDiGraph()
+        graph.add_edges_from([('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'b')])
+        # link 3 gets no messages
+        graph.add_node('graph_data', incoming_links=[0, 1, 2, 3], outcoming_links=[1, 0, 1, 2])
+        self.actor = Actor(graph, num_features=2, message_iterations=2)
+        self.actor.build()
+        self.states = np.random.default_rng(1).uniform(size=(3, 8)).astype(np.float32)
+
+    def test_same_logits_as_actor(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'actor.npz')
+            export_actor(self.actor, path)
+            actor = NumpyActor.load(path)
+        expected = self.actor(self.states).numpy()
+        np.testing.assert_allclose(actor.logits(self.states), expected, rtol=1e-4, atol=1e-6)
+        self.assertEqual(actor.act(self.states[0]), int(np.argmax(expected[0])))
@@ -0,0 +1,71 @@
+import gin
+import networkx
+import numpy as np
+import tensorflow as tf
+
+from dte_stand.algorithm.mate.agents.ppo_agent import PPOAgent
+from dte_stand.algorithm.mate.environment.environment import Environment
+from dte_stand.data_structures import Flows
+from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from dte_stand.paths.dag_calculator import DAGCalculator
+
+import unittest
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+FLOWS_PATH = 'data_examples/flows0.log'
+
+
+def make_agent(shared_encoder: bool) -> PPOAgent:
+    with open(TOPOLOGY_PATH, 'rb') as f:
+        topology = networkx.readwrite.read_gml(f)
+    path_calculator = DAGCalculator()
+    path_calculator.prepare_iteration(topology)
+    env = Environment(topology, WeightedDxHashFunction(path_calculator))
+    agent = PPOAgent(env, num_envs=2, shared_encoder=shared_encoder)
+    agent.envs.get_current_flows(Flows(FLOWS_PATH).get(0))
+    agent.reset_env()
+    return agent
+
+
+class TestPPOAgent(unittest.TestCase):
+    def setUp(self):
+        # one iteration of message passing keeps tracing of compiled functions short
+        gin.bind_parameter('Actor.message_iterations', 1)
+        gin.bind_parameter('Critic.message_iterations', 1)
+
+    def tearDown(self):
+        gin.clear_config()
+
+    def test_act_and_value(self):
+        agent = make_agent(shared_encoder=False)
+        graph = agent.actor.graph
+        states = agent.envs.get_state().copy()
+        actions, log_probs, values = agent.act_and_value(graph.pad_states(states), graph.inputs, select_max=True)
+        self.assertEqual(actions.shape, [2])
+        self.assertEqual(log_probs.shape, [2])
+        np.testing.assert_array_equal(actions, np.argmax(agent.actor(states), axis=1))
+        np.testing.assert_allclose(values, agent.critic(states), rtol=1e-5, atol=1e-6)
+
+    def test_shared_encoder_trains_message_passing(self):
+        agent = make_agent(shared_encoder=True)
+        graph = agent.actor.graph
+        states = graph.pad_states(agent.envs.get_state())
+        actions, log_probs, values = agent.act_and_value(states, graph.inputs)
+        np.testing.assert_allclose(values, agent.run_critic_batch(states, graph.inputs), rtol=1e-5, atol=1e-6)
+
+        returns = np.array([1., -1.], dtype=np.float32)
+        advantages = np.array([1., -1.], dtype=np.float32)
+        *_, grads = agent.compute_losses_and_grads(states, actions, returns, advantages, log_probs, graph.inputs)
+        variables = agent._trainable_variables()
+        self.assertEqual(len(grads), len(variables))
+        gradients = {variable.ref(): grad for variable, grad in zip(variables, grads)}
+        for network in (agent.actor.create_message, agent.actor.link_update, agent.critic.readout):
+            for variable in network.trainable_variables:
+                self.assertIsNotNone(gradients[variable.ref()], variable.name)
+                self.assertGreater(float(tf.norm(gradients[variable.ref()])), 0., variable.name)
+        # critic's own message passing is not used
+        self.assertNotIn(agent.critic.create_message.trainable_variables[0].ref(), gradients)
+
+
+if __name__ == "__main__":
+    unittest.main()
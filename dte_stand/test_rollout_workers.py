@@ -0,0 +1,106 @@
+import gin
+import networkx
+import numpy as np
+from multiprocessing import shared_memory
+
+from dte_stand.algorithm.mate.agents.ppo_agent import PPOAgent
+from dte_stand.algorithm.mate.agents.rollout_workers import RolloutWorkers, SharedArrays
+from dte_stand.algorithm.mate.environment.environment import Environment
+from dte_stand.data_structures import Flows
+from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from dte_stand.paths.dag_calculator import DAGCalculator
+
+import unittest
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+FLOWS_PATH = 'data_examples/flows0.log'
+HORIZON = 10
+
+
+class TestRolloutWorkers(unittest.TestCase):
+    def setUp(self):
+        # workers get the same config, one iteration of message passing keeps their tracing short
+        gin.bind_parameter('Actor.message_iterations', 1)
+        gin.bind_parameter('Critic.message_iterations', 1)
+        with open(TOPOLOGY_PATH, 'rb') as f:
+            self.topology = networkx.readwrite.read_gml(f)
+        path_calculator = DAGCalculator()
+        path_calculator.prepare_iteration(self.topology)
+        env = Environment(self.topology, WeightedDxHashFunction(path_calculator))
+        self.agent = PPOAgent(env, horizon=HORIZON, num_envs=2, save_checkpoints=False)
+        self.flows = Flows(FLOWS_PATH).get(0)
+        self.agent.envs.get_current_flows(self.flows)
+        self.workers = RolloutWorkers(self.agent, 1, self.flows)
+        self.agent.rollout_pool = self.workers
+        self.shared_names = [shared.name for shared in self.workers._shared]
+
+    def tearDown(self):
+        self.workers.close()
+        gin.clear_config()
+
+    def assert_shared_memory_removed(self):
+        for name in self.shared_names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+    def test_episode_of_worker(self):
+        other_loads = self.agent.envs.envs[1].link_loads.loads.copy()
+        states, actions, rewards, log_probs, values, last_value, phi = self.agent.run_episode()
+        n_links = self.agent.env.n_links
+        self.assertEqual(states.shape, (HORIZON, 2, 2 * n_links))
+        for array in (actions, rewards, log_probs, values):
+            self.assertEqual(array.shape, (HORIZON, 2))
+        self.assertEqual(last_value.shape, (2,))
+        self.assertIsInstance(phi, float)
+
+        # first environment of the agent continues from the weights of the worker, with flows routed by them
+        env = self.agent.env
+        self.assertFalse(np.array_equal(env.raw_weights, env.init_weights))
+        loads = env.link_loads.loads.copy()
+        env._get_HashWeights()
+        env._calculate_current_bandwidth(env.G, env.current_flows, env.hash_weights)
+        np.testing.assert_allclose(env.link_loads.loads, loads)
+        # flows of other environments of the agent are not routed
+        np.testing.assert_array_equal(self.agent.envs.envs[1].link_loads.loads, other_loads)
+
+    def test_failed_worker_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.workers.run_episode([np.zeros(1, dtype=np.float32)], [], False)
+
+    def test_changed_shapes_are_rejected(self):
+        # horizon of another topology
+        self.agent.horizon = HORIZON + 1
+        with self.assertRaisesRegex(RuntimeError, 'started for horizon 10'):
+            self.agent.run_episode()
+        shared = SharedArrays({'values': ((HORIZON, 2), 'float32')})
+        self.addCleanup(shared.close, unlink=True)
+        with self.assertRaisesRegex(ValueError, 'number of links or horizon changed'):
+            shared.write('values', np.zeros((HORIZON + 1, 2)))
+
+    def test_close_removes_shared_memory(self):
+        self.workers.close()
+        self.assert_shared_memory_removed()
+
+    def test_workers_are_kept_between_experiments(self):
+        # training ends at once, only starting and stopping of workers is left
+        self.agent.rollout_workers = 1
+        self.agent.change_sample = True
+        self.agent.env.num_sample = self.agent.last_training_sample
+        self.agent.train_and_evaluate(self.topology, self.flows, self.agent.env.hash_function, 0)
+        self.assertIs(self.agent.rollout_pool, self.workers)
+
+        self.agent.prepare_experiment(self.topology)
+        self.assertIs(self.agent.rollout_pool, self.workers)
+        states, *_ = self.agent.run_episode()
+        self.assertEqual(states.shape, (HORIZON, 2, 2 * self.agent.env.n_links))
+
+        # episodes of a topology with other links do not fit into shared memory of workers
+        smaller = self.topology.copy()
+        smaller.remove_node('15')
+        self.agent.prepare_experiment(smaller)
+        self.assertIsNone(self.agent.rollout_pool)
+        self.assert_shared_memory_removed()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import networkx
+
+from dte_stand.data_structures import Topology
+
+import unittest
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+
+
+class TestTopology(unittest.TestCase):
+    def setUp(self):
+        changes = {
+            '5000': {'missing_nodes': [], 'missing_links': [['0', '1', 0]]},
+            '40000': {'missing_nodes': ['15'], 'missing_links': []},
+            '120000': {'missing_nodes': [], 'missing_links': []},
+        }
+        changes_file = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        with changes_file:
+            json.dump(changes, changes_file)
+        self.addCleanup(os.remove, changes_file.name)
+        self.topology = Topology(TOPOLOGY_PATH, changes_file.name)
+
+    def test_changes_in_time_order(self):
+        self.assertEqual(self.topology.get(1000)[1], None)
+        topology, change_time = self.topology.get(10000)
+        self.assertEqual(change_time, 5000)
+        self.assertFalse(topology.has_edge('0', '1', 0))
+        topology, change_time = self.topology.get(50000)
+        self.assertEqual(change_time, 40000)
+        self.assertNotIn('15', topology)
+        self.assertTrue(topology.has_edge('0', '1', 0))
+        self.assertEqual(self.topology.get(60000)[1], 40000)
+        self.assertEqual(self.topology.get(130000)[1], 120000)
+
+    def test_same_state_is_shared(self):
+        first, _ = self.topology.get(10000)
+        second, _ = self.topology.get(20000)
+        self.assertTrue(networkx.is_frozen(first))
+        with self.assertRaises(networkx.NetworkXError):
+            first.remove_node('0')
+        self.assertIs(first.edges['1', '0', 0], second.edges['1', '0', 0])
+
+    def test_mutable_copy(self):
+        view, _ = self.topology.get(10000)
+        copy, _ = self.topology.get(10000, mutable=True)
+        copy.edges['1', '0', 0]['current_bandwidth'] = 123
+        copy.remove_node('0')
+        self.assertNotEqual(view.edges['1', '0', 0]['current_bandwidth'], 123)
+        self.assertIn('0', view)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import networkx
+import numpy as np
+
+from dte_stand.algorithm.mate.environment.environment import Environment
+from dte_stand.algorithm.mate.environment.vector_environment import VectorEnvironment
+from dte_stand.data_structures import Flows
+from dte_stand.hash_function.dxhash import WeightedDxHashFunction
+from dte_stand.paths.dag_calculator import DAGCalculator
+
+import unittest
+
+TOPOLOGY_PATH = 'data_examples/huawei.gml'
+FLOWS_PATH = 'data_examples/flows0.log'
+
+
+def make_environment(topology) -> Environment:
+    path_calculator = DAGCalculator()
+    path_calculator.prepare_iteration(topology)
+    return Environment(topology, WeightedDxHashFunction(path_calculator))
+
+
+class TestVectorEnvironment(unittest.TestCase):
+    def setUp(self):
+        with open(TOPOLOGY_PATH, 'rb') as f:
+            self.topology = networkx.readwrite.read_gml(f)
+        self.env = make_environment(self.topology)
+        self.envs = VectorEnvironment.from_environment(self.env, 3)
+        self.envs.get_current_flows(Flows(FLOWS_PATH).get(0))
+
+    def test_batch_shapes(self):
+        n_links = self.env.n_links
+        states = self.envs.reset()
+        self.assertEqual(states.shape, (3, n_links * self.env.num_features))
+        states, rewards = self.envs.step(np.array([0, 1, 2]))
+        self.assertEqual(states.shape, (3, n_links * self.env.num_features))
+        self.assertEqual(rewards.shape, (3,))
+        for k, env in enumerate(self.envs.envs):
+            np.testing.assert_array_equal(states[k], env.get_state())
+
+    def test_environments_keep_own_weights(self):
+        self.assertIs(self.envs.envs[0], self.env)
+        self.envs.reset()
+        # other environments are seeded after the first one, so they start from other weights
+        initial_weights = [env.raw_weights.copy() for env in self.envs.envs]
+        self.assertEqual([env.seed_init_weights for env in self.envs.envs], [1, 2, 3])
+        self.assertFalse(np.array_equal(initial_weights[0], initial_weights[1]))
+        self.assertFalse(np.array_equal(initial_weights[1], initial_weights[2]))
+
+        self.envs.step(np.array([0, 1, 2]))
+        for k, env in enumerate(self.envs.envs):
+            changed = np.flatnonzero(env.raw_weights != initial_weights[k])
+            self.assertEqual(changed.tolist(), [k])
+
+    def test_different_number_of_links_is_rejected(self):
+        smaller = self.topology.copy()
+        smaller.remove_node('15')
+        with self.assertRaises(ValueError):
+            VectorEnvironment([self.env, make_environment(smaller)])
+        with self.assertRaises(ValueError):
+            VectorEnvironment([])
+
+
+if __name__ == "__main__":
+    unittest.main()